@@ -0,0 +1,44 @@
+"""post feed
+
+Revision ID: 0b9c7e4a2d18
+Revises: f2a8d5e1c937
+Create Date: 2026-10-18 18:22:16.305847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9c7e4a2d18'
+down_revision: Union[str, None] = 'f2a8d5e1c937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('post_feed',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('vote_sum', sa.Integer(), nullable=False),
+    sa.Column('comment_count', sa.Integer(), nullable=False),
+    sa.Column('decay', sa.Float(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_feed_score_post_id', 'post_feed', ['score', 'post_id'], unique=False)
+    # backfill the counters, decay and score follow on the app's first
+    # recompute or with python -m app.cli rebuild-feed
+    op.execute(
+        "INSERT INTO post_feed (post_id, vote_sum, comment_count, decay, score) "
+        "SELECT posts.id, COALESCE(post_vote_stats.vote_sum, 0), "
+        "(SELECT COUNT(post_comments.id) FROM post_comments WHERE post_comments.post_id = posts.id), 0, 0 "
+        "FROM posts LEFT OUTER JOIN post_vote_stats ON post_vote_stats.post_id = posts.id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_feed_score_post_id', table_name='post_feed')
+    op.drop_table('post_feed')
@@ -0,0 +1,42 @@
+"""keyset pagination indexes
+
+Revision ID: 3c1f8e2b7a45
+Revises: 9d0a061e01aa
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f8e2b7a45'
+down_revision: Union[str, None] = '9d0a061e01aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post_votes', sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('post_comments', sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    # bound from python so sqlite stores the same text format the ORM writes,
+    # CURRENT_TIMESTAMP has no fractional part and sorts apart from cursors
+    now = sa.bindparam('now', datetime.utcnow(), type_=sa.TIMESTAMP(timezone=True))
+    op.execute(sa.text("UPDATE post_votes SET created_at = :now WHERE created_at IS NULL").bindparams(now))
+    op.execute(sa.text("UPDATE post_comments SET created_at = :now WHERE created_at IS NULL").bindparams(now))
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_posts_owner_id_created_at_id', 'posts', ['owner_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_post_votes_post_id_created_at_id', 'post_votes', ['post_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_post_comments_post_id_created_at_id', 'post_comments', ['post_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_comments_post_id_created_at_id', table_name='post_comments')
+    op.drop_index('ix_post_votes_post_id_created_at_id', table_name='post_votes')
+    op.drop_index('ix_posts_owner_id_created_at_id', table_name='posts')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_column('post_comments', 'created_at')
+    op.drop_column('post_votes', 'created_at')
@@ -0,0 +1,124 @@
+"""post search
+
+Revision ID: 3d6f1b8e4c52
+Revises: 0b9c7e4a2d18
+Create Date: 2026-10-18 19:04:51.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d6f1b8e4c52'
+down_revision: Union[str, None] = '0b9c7e4a2d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE post_search USING fts5(title, description, comments, tokenize='porter unicode61')",
+    """CREATE TRIGGER post_search_posts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO post_search (rowid, title, description, comments) VALUES (new.id, new.title, coalesce(new.description, ''), '');
+    END""",
+    """CREATE TRIGGER post_search_posts_update AFTER UPDATE OF title, description ON posts BEGIN
+        UPDATE post_search SET title = new.title, description = coalesce(new.description, '') WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER post_search_posts_delete AFTER DELETE ON posts BEGIN
+        DELETE FROM post_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER post_search_comments_insert AFTER INSERT ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END""",
+    """CREATE TRIGGER post_search_comments_update AFTER UPDATE OF comment ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END""",
+    """CREATE TRIGGER post_search_comments_delete AFTER DELETE ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = old.post_id
+        ) WHERE rowid = old.post_id;
+    END""",
+    # backfill
+    """INSERT INTO post_search (rowid, title, description, comments)
+    SELECT posts.id, posts.title, coalesce(posts.description, ''), coalesce(
+        (SELECT group_concat(comment, ' ') FROM post_comments WHERE post_comments.post_id = posts.id), ''
+    ) FROM posts""",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER post_search_comments_delete",
+    "DROP TRIGGER post_search_comments_update",
+    "DROP TRIGGER post_search_comments_insert",
+    "DROP TRIGGER post_search_posts_delete",
+    "DROP TRIGGER post_search_posts_update",
+    "DROP TRIGGER post_search_posts_insert",
+    "DROP TABLE post_search",
+]
+
+POSTGRESQL_DOCUMENT = """
+    setweight(to_tsvector('english', posts.title), 'A') ||
+    setweight(to_tsvector('english', coalesce(posts.description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(comment, ' ') FROM post_comments WHERE post_comments.post_id = posts.id), ''
+    )), 'C')
+"""
+
+POSTGRESQL_UPGRADE = [
+    """CREATE TABLE post_search (
+        post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    f"""CREATE FUNCTION post_search_refresh(target INTEGER) RETURNS VOID AS $$
+        INSERT INTO post_search (post_id, document)
+        SELECT posts.id, {POSTGRESQL_DOCUMENT} FROM posts WHERE posts.id = target
+        ON CONFLICT (post_id) DO UPDATE SET document = excluded.document;
+    $$ LANGUAGE SQL""",
+    """CREATE FUNCTION post_search_posts_trigger() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM post_search_refresh(NEW.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER post_search_posts AFTER INSERT OR UPDATE OF title, description ON posts
+        FOR EACH ROW EXECUTE FUNCTION post_search_posts_trigger()""",
+    """CREATE FUNCTION post_search_comments_trigger() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM post_search_refresh(OLD.post_id);
+        ELSE
+            PERFORM post_search_refresh(NEW.post_id);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER post_search_comments AFTER INSERT OR UPDATE OF comment OR DELETE ON post_comments
+        FOR EACH ROW EXECUTE FUNCTION post_search_comments_trigger()""",
+    # backfill before indexing, building the GIN index once is cheaper
+    f"INSERT INTO post_search (post_id, document) SELECT posts.id, {POSTGRESQL_DOCUMENT} FROM posts",
+    "CREATE INDEX ix_post_search_document ON post_search USING GIN (document)",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP TRIGGER post_search_comments ON post_comments",
+    "DROP TRIGGER post_search_posts ON posts",
+    "DROP FUNCTION post_search_comments_trigger()",
+    "DROP FUNCTION post_search_posts_trigger()",
+    "DROP FUNCTION post_search_refresh(INTEGER)",
+    "DROP TABLE post_search",
+]
+
+
+def upgrade() -> None:
+    statements = POSTGRESQL_UPGRADE if op.get_bind().dialect.name == "postgresql" else SQLITE_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    statements = POSTGRESQL_DOWNGRADE if op.get_bind().dialect.name == "postgresql" else SQLITE_DOWNGRADE
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,89 @@
+"""jobs outbox
+
+Revision ID: 5e2b9c4d7a61
+Revises: 3d6f1b8e4c52
+Create Date: 2026-10-18 20:12:37.604918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b9c4d7a61'
+down_revision: Union[str, None] = '3d6f1b8e4c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# comments are reindexed by the refresh_posts job from now on
+SQLITE_UPGRADE = [
+    "DROP TRIGGER post_search_comments_delete",
+    "DROP TRIGGER post_search_comments_update",
+    "DROP TRIGGER post_search_comments_insert",
+]
+
+SQLITE_DOWNGRADE = [
+    """CREATE TRIGGER post_search_comments_insert AFTER INSERT ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END""",
+    """CREATE TRIGGER post_search_comments_update AFTER UPDATE OF comment ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END""",
+    """CREATE TRIGGER post_search_comments_delete AFTER DELETE ON post_comments BEGIN
+        UPDATE post_search SET comments = (
+            SELECT coalesce(group_concat(comment, ' '), '') FROM post_comments WHERE post_id = old.post_id
+        ) WHERE rowid = old.post_id;
+    END""",
+]
+
+POSTGRESQL_UPGRADE = [
+    "DROP TRIGGER post_search_comments ON post_comments",
+    "DROP FUNCTION post_search_comments_trigger()",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    """CREATE FUNCTION post_search_comments_trigger() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM post_search_refresh(OLD.post_id);
+        ELSE
+            PERFORM post_search_refresh(NEW.post_id);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER post_search_comments AFTER INSERT OR UPDATE OF comment OR DELETE ON post_comments
+        FOR EACH ROW EXECUTE FUNCTION post_search_comments_trigger()""",
+]
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('run_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_run_at_id', 'jobs', ['status', 'run_at', 'id'], unique=False)
+    statements = POSTGRESQL_UPGRADE if op.get_bind().dialect.name == "postgresql" else SQLITE_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    statements = POSTGRESQL_DOWNGRADE if op.get_bind().dialect.name == "postgresql" else SQLITE_DOWNGRADE
+    for statement in statements:
+        op.execute(statement)
+    op.drop_index('ix_jobs_status_run_at_id', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,46 @@
+"""post vote stats
+
+Revision ID: 7b2d4f9c1e08
+Revises: 3c1f8e2b7a45
+Create Date: 2026-10-18 11:40:03.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d4f9c1e08'
+down_revision: Union[str, None] = '3c1f8e2b7a45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('post_vote_stats',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('vote_count', sa.Integer(), nullable=False),
+    sa.Column('vote_sum', sa.Integer(), nullable=False),
+    sa.Column('votes_0', sa.Integer(), nullable=False),
+    sa.Column('votes_1', sa.Integer(), nullable=False),
+    sa.Column('votes_2', sa.Integer(), nullable=False),
+    sa.Column('votes_3', sa.Integer(), nullable=False),
+    sa.Column('votes_4', sa.Integer(), nullable=False),
+    sa.Column('votes_5', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    # backfill from the existing vote rows
+    op.execute(
+        "INSERT INTO post_vote_stats "
+        "(post_id, vote_count, vote_sum, votes_0, votes_1, votes_2, votes_3, votes_4, votes_5) "
+        "SELECT posts.id, COUNT(post_votes.id), COALESCE(SUM(post_votes.vote), 0), "
+        + ", ".join(f"COALESCE(SUM(CASE WHEN post_votes.vote = {value} THEN 1 ELSE 0 END), 0)" for value in range(6))
+        + " FROM posts LEFT OUTER JOIN post_votes ON post_votes.post_id = posts.id GROUP BY posts.id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('post_vote_stats')
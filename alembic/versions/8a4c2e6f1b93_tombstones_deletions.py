@@ -0,0 +1,39 @@
+"""tombstones and deletions
+
+Revision ID: 8a4c2e6f1b93
+Revises: 5e2b9c4d7a61
+Create Date: 2026-10-18 20:47:05.281346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4c2e6f1b93'
+down_revision: Union[str, None] = '5e2b9c4d7a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('posts', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_table('deletions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('rows_deleted', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('deletions')
+    op.drop_column('posts', 'deleted_at')
+    op.drop_column('users', 'deleted_at')
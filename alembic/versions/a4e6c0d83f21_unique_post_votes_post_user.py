@@ -0,0 +1,39 @@
+"""unique post votes per user
+
+Revision ID: a4e6c0d83f21
+Revises: 7b2d4f9c1e08
+Create Date: 2026-10-18 14:05:27.901346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e6c0d83f21'
+down_revision: Union[str, None] = '7b2d4f9c1e08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep the latest vote of every (post_id, user_id) pair before enforcing uniqueness
+    op.execute(
+        "DELETE FROM post_votes WHERE id NOT IN "
+        "(SELECT MAX(id) FROM post_votes GROUP BY post_id, user_id)"
+    )
+    op.execute("DELETE FROM post_vote_stats")
+    op.execute(
+        "INSERT INTO post_vote_stats "
+        "(post_id, vote_count, vote_sum, votes_0, votes_1, votes_2, votes_3, votes_4, votes_5) "
+        "SELECT posts.id, COUNT(post_votes.id), COALESCE(SUM(post_votes.vote), 0), "
+        + ", ".join(f"COALESCE(SUM(CASE WHEN post_votes.vote = {value} THEN 1 ELSE 0 END), 0)" for value in range(6))
+        + " FROM posts LEFT OUTER JOIN post_votes ON post_votes.post_id = posts.id GROUP BY posts.id"
+    )
+    op.create_index('ix_post_votes_post_id_user_id', 'post_votes', ['post_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_votes_post_id_user_id', table_name='post_votes')
@@ -0,0 +1,32 @@
+"""fix backfilled created_at
+
+Revision ID: b7e3d1a9c462
+Revises: 8a4c2e6f1b93
+Create Date: 2026-10-19 09:31:12.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d1a9c462'
+down_revision: Union[str, None] = '8a4c2e6f1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # sqlite databases migrated through 3c1f8e2b7a45 before its backfill was
+    # fixed hold CURRENT_TIMESTAMP text without microseconds, pad it to the
+    # format the ORM writes so keyset cursors compare against it correctly
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in ('post_votes', 'post_comments'):
+        op.execute(f"UPDATE {table} SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,26 @@
+"""posts owner_id puid index
+
+Revision ID: c58a1b3e9d72
+Revises: a4e6c0d83f21
+Create Date: 2026-10-18 15:31:52.118740
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58a1b3e9d72'
+down_revision: Union[str, None] = 'a4e6c0d83f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_owner_id_puid', 'posts', ['owner_id', 'puid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_owner_id_puid', table_name='posts')
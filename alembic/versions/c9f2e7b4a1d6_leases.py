@@ -0,0 +1,31 @@
+"""leases
+
+Revision ID: c9f2e7b4a1d6
+Revises: b7e3d1a9c462
+Create Date: 2026-10-19 10:48:26.117390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f2e7b4a1d6'
+down_revision: Union[str, None] = 'b7e3d1a9c462'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('leases',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('holder', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leases')
@@ -0,0 +1,33 @@
+"""deletions owner_id
+
+Revision ID: d4a8f2c6e1b7
+Revises: c9f2e7b4a1d6
+Create Date: 2026-10-19 14:12:37.504218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f2c6e1b7'
+down_revision: Union[str, None] = 'c9f2e7b4a1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('deletions', sa.Column('owner_id', sa.Integer(), nullable=True))
+    # users delete themselves, posts are deleted by their owner; posts purged
+    # already are left to the admin token
+    op.execute("UPDATE deletions SET owner_id = target_id WHERE kind = 'user'")
+    op.execute(
+        "UPDATE deletions SET owner_id = (SELECT posts.owner_id FROM posts WHERE posts.id = deletions.target_id) "
+        "WHERE kind = 'post'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('deletions', 'owner_id')
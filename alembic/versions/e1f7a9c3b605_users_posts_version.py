@@ -0,0 +1,28 @@
+"""users posts version
+
+Revision ID: e1f7a9c3b605
+Revises: c58a1b3e9d72
+Create Date: 2026-10-18 16:12:04.583211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7a9c3b605'
+down_revision: Union[str, None] = 'c58a1b3e9d72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('posts', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'version')
+    op.drop_column('users', 'version')
@@ -0,0 +1,30 @@
+"""cache generations
+
+Revision ID: e6b3c9d2f4a8
+Revises: d4a8f2c6e1b7
+Create Date: 2026-10-19 16:03:51.738146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3c9d2f4a8'
+down_revision: Union[str, None] = 'd4a8f2c6e1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cache_generations',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cache_generations')
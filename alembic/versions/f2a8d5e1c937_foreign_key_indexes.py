@@ -0,0 +1,30 @@
+"""foreign key indexes
+
+Revision ID: f2a8d5e1c937
+Revises: e1f7a9c3b605
+Create Date: 2026-10-18 17:05:41.927310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a8d5e1c937'
+down_revision: Union[str, None] = 'e1f7a9c3b605'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # post_id and owner_id already lead the keyset indexes, user_id is only
+    # read by ON DELETE CASCADE and the account deletion lookups
+    op.create_index('ix_post_votes_user_id', 'post_votes', ['user_id'], unique=False)
+    op.create_index('ix_post_comments_user_id', 'post_comments', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_comments_user_id', table_name='post_comments')
+    op.drop_index('ix_post_votes_user_id', table_name='post_votes')
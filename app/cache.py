@@ -0,0 +1,101 @@
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+# Cache backends
+# MemoryCache is a per-process bounded LRU with TTL. RedisCache shares entries
+# across workers through any client exposing get/set(ex=)/delete, such as
+# redis.Redis or fakeredis.FakeRedis.
+
+class CacheBackend:
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+class MemoryCache(CacheBackend):
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize}
+
+class RedisCache(CacheBackend):
+    def __init__(self, client, prefix="cache", ttl=60, dumps=pickle.dumps, loads=pickle.loads):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self._key(key), self.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.prefix}:*"))
+        if keys:
+            self.client.delete(*keys)
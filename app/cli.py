@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+from datetime import datetime
+
+from . import vote_stats, feed, search, tasks
+from .database import SessionLocal
+from .jobs import job_queue
+
+# maintenance commands
+# python -m app.cli <command>
+
+def rebuild_vote_stats(args):
+    db = SessionLocal()
+    try:
+        for statement in vote_stats.rebuild_statements(args.post_ids or None):
+            db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+    print("vote stats rebuilt!")
+
+def rebuild_feed(args):
+    db = SessionLocal()
+    try:
+        db.execute(feed.missing_rows_statement())
+        db.execute(feed.refresh_statement())
+        now, after_id = datetime.utcnow(), 0
+        while rows := db.execute(feed.decay_batches_query(after_id)).all():
+            db.execute(feed.decay_statement(), feed.decay_params(rows, now))
+            after_id = rows[-1].id
+        db.commit()
+    finally:
+        db.close()
+    print("feed rebuilt!")
+
+def rebuild_search(args):
+    db = SessionLocal()
+    try:
+        for statement in search.rebuild_statements(db.bind.dialect.name):
+            db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+    print("search index rebuilt!")
+
+def worker(args):
+    # handlers are registered by importing app.tasks
+    if args.once:
+        asyncio.run(job_queue.drain())
+        print("jobs drained!")
+    else:
+        print("job worker running!")
+        asyncio.run(job_queue.run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-vote-stats", help="recompute post_vote_stats from post_votes")
+    rebuild.add_argument("post_ids", nargs="*", type=int, help="posts to rebuild, all posts when omitted")
+    rebuild.set_defaults(handler=rebuild_vote_stats)
+
+    rebuild = commands.add_parser("rebuild-feed", help="recompute post_feed counters and decay for every post")
+    rebuild.set_defaults(handler=rebuild_feed)
+
+    rebuild = commands.add_parser("rebuild-search", help="reindex the title, description and comments of every post")
+    rebuild.set_defaults(handler=rebuild_search)
+
+    run_worker = commands.add_parser("worker", help="run queued jobs, for apps started with jobs_in_process=false")
+    run_worker.add_argument("--once", action="store_true", help="run the jobs due now and exit")
+    run_worker.set_defaults(handler=worker)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import re
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response compression
+# negotiates br / gzip from Accept-Encoding for the allowed content types.
+# Bodies below compression_minimum_size go out as they are, streamed bodies
+# are compressed chunk by chunk and flushed so clients see every chunk.
+# A compressed variant is a different representation: its ETag gets the
+# coding appended ("p1-2-3" -> "p1-2-3-gzip") and Vary: Accept-Encoding is
+# always set, so shared caches key the variants apart. The suffix is
+# stripped from If-None-Match again before the handlers compare ETags.
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        # wbits 31: deflate inside a gzip container
+        self._compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+# preferred first
+ENCODERS = {"br": BrotliEncoder, "gzip": GzipEncoder} if brotli else {"gzip": GzipEncoder}
+
+ETAG_SUFFIX = re.compile(r'-(?:%s)"' % "|".join(map(re.escape, ENCODERS)))
+
+def negotiate(accept_encoding):
+    """Best coding in ENCODERS the client accepts, or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    for coding in ENCODERS:
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+def is_compressible(content_type):
+    media_type = content_type.partition(";")[0].strip().lower()
+    return any(
+        media_type.startswith(allowed.strip())
+        for allowed in settings.compression_content_types.split(",") if allowed.strip()
+    )
+
+def variant_etag(etag, coding):
+    return etag[:-1] + f'-{coding}"' if etag.endswith('"') else etag
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = negotiate(request_headers.get("accept-encoding", ""))
+        # the coding of the variant the client revalidates, if it holds one
+        revalidated = None
+        suffix = ETAG_SUFFIX.search(request_headers.get("if-none-match", ""))
+        if suffix:
+            revalidated = suffix.group(0)[1:-1]
+            # rewritten in place, the outer middlewares read back what routing
+            # stores in this scope (record_timing's route label)
+            scope["headers"] = [
+                (name, ETAG_SUFFIX.sub('"', value.decode("latin-1")).encode("latin-1") if name == b"if-none-match" else value)
+                for name, value in scope["headers"]
+            ]
+        responder = CompressionResponder(self.app, coding, revalidated)
+        await responder(scope, receive, send)
+
+class CompressionResponder:
+    def __init__(self, app, coding, revalidated):
+        self.app = app
+        self.coding = coding
+        self.revalidated = revalidated
+        self.send = None
+        self.initial_message = None
+        self.encoder = None
+        self.started = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            # held back until the first body chunk decides the headers
+            self.initial_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if not self.started:
+            self.started = True
+            await self.start(message)
+            return
+        if self.encoder is None:
+            await self.send(message)
+            return
+        body = self.encoder.compress(message.get("body", b""))
+        if message.get("more_body", False):
+            body += self.encoder.flush()
+        else:
+            body += self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": body, "more_body": message.get("more_body", False)})
+
+    async def start(self, message):
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        status = self.initial_message["status"]
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if status == 304:
+            headers.add_vary_header("Accept-Encoding")
+            if self.revalidated and "etag" in headers:
+                headers["ETag"] = variant_etag(headers["ETag"], self.revalidated)
+        elif "content-encoding" not in headers and is_compressible(headers.get("content-type", "")):
+            headers.add_vary_header("Accept-Encoding")
+            if self.coding and (more_body or len(body) >= settings.compression_minimum_size):
+                self.encoder = ENCODERS[self.coding]()
+                headers["Content-Encoding"] = self.coding
+                if "etag" in headers:
+                    headers["ETag"] = variant_etag(headers["ETag"], self.coding)
+                body = self.encoder.compress(body)
+                if more_body:
+                    del headers["Content-Length"]
+                    body += self.encoder.flush()
+                else:
+                    body += self.encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                message = {"type": "http.response.body", "body": body, "more_body": more_body}
+        await self.send(self.initial_message)
+        await self.send(message)
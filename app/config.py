@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Any, Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +9,71 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int
     environment: str
     allowed_origins: str
+    admin_token: Optional[str] = None
+    user_cache_size: int = 10000
+    user_cache_ttl: int = 60
+    token_cache_size: int = 10000
+    password_schemes: str = "bcrypt,sha256_crypt"
+    hash_workers: int = 2
+    hash_max_pending: int = 16
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: Optional[int] = None
+    db_prepared_statement_cache_size: int = 500
+    db_connect_args: Dict[str, Any] = {}
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size: int = -64000
+    sqlite_foreign_keys: bool = True
+    replica_database_urls: str = ""
+    replica_sticky_seconds: float = 5
+    replica_retry_seconds: float = 30
+    http_cache_control: str = "public, max-age=0, must-revalidate"
+    http_cache_control_private: str = "private, no-cache"
+    response_cache_size: int = 10000
+    response_cache_ttl: int = 30
+    response_cache_sync_seconds: float = 1
+    compression_minimum_size: int = 500
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_content_types: str = "application/json,application/x-ndjson,text/"
+    batch_max_items: int = 500
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5
+    profile_slow_ms: float = 500
+    profile_dir: str = "profiles"
+    slow_query_ms: float = 200
+    slow_query_top_n: int = 50
+    slow_query_explain: bool = True
+    feed_comment_weight: float = 2.0
+    feed_gravity: float = 1.8
+    feed_recompute_seconds: float = 300
+    jobs_in_process: bool = True
+    jobs_poll_seconds: float = 1
+    jobs_batch_size: int = 100
+    jobs_max_attempts: int = 5
+    jobs_retry_seconds: float = 2
+    jobs_lease_seconds: float = 300
+    jobs_shutdown_seconds: float = 10
+    purge_batch_size: int = 1000
+    rate_limit_enabled: bool = True
+    rate_limit_default: str = "600/minute"
+    rate_limit_store_size: int = 100000
+    rate_limits: Dict[str, str] = {
+        "POST /auth/token": "10/minute",
+        "POST /api/v1/users/": "20/hour",
+        "POST /api/v1/batch/votes": "60/minute",
+        "POST /api/v1/batch/comments": "60/minute",
+    }
+    admission_max_in_flight: int = 200
+    admission_max_pool_waiters: int = 20
+    admission_retry_after: int = 1
+    admission_exempt_paths: str = "/metrics,/status"
 
     class Config:
         env_file = ".env"
@@ -1,13 +1,159 @@
-from sqlalchemy import create_engine
+import time
+from threading import Lock
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
 
-engine = create_engine(
-    settings.database_url, connect_args={"check_same_thread": False}
-)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url(database_url):
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend}!")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+# Pool checkout metrics
+# time spent waiting for a pooled connection, the first thing to degrade
+# when traffic spikes past pool_size + max_overflow. `waiting` counts the
+# checkouts in progress right now, admission control sheds load on it.
+
+class PoolMetrics:
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = Lock()
+        self.waiting = 0
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(self.buckets)
+
+    def observe(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.bucket_counts[index] += 1
+
+    def enter(self):
+        with self._lock:
+            self.waiting += 1
+
+    def exit(self):
+        with self._lock:
+            self.waiting -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waiting": self.waiting,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_buckets": dict(zip(self.buckets, self.bucket_counts)),
+            }
+
+pool_metrics = PoolMetrics()
+
+class TimedPoolMixin:
+    def _do_get(self):
+        started = time.perf_counter()
+        pool_metrics.enter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        finally:
+            pool_metrics.exit()
+        pool_metrics.observe(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(database_url, is_async=False):
+    """create_engine keyword arguments for the dialect of `database_url`."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    connect_args = dict(settings.db_connect_args)
+    options = {}
+    if backend == "sqlite":
+        connect_args.setdefault("check_same_thread", False)
+        if url.database in (None, "", ":memory:"):
+            # in-memory databases live and die with their single connection
+            return {"connect_args": connect_args}
+    elif backend == "postgresql":
+        timeout = settings.db_statement_timeout_ms
+        if is_async:
+            # asyncpg prepares statements server side and caches them per connection
+            connect_args.setdefault("prepared_statement_cache_size", settings.db_prepared_statement_cache_size)
+            if timeout:
+                connect_args.setdefault("server_settings", {}).setdefault("statement_timeout", str(timeout))
+        elif timeout:
+            connect_args.setdefault("options", f"-c statement_timeout={timeout}")
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    return options
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    # enforce ON DELETE CASCADE, purges rely on it like on postgresql
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if settings.sqlite_foreign_keys else 'OFF'}")
+    cursor.close()
+
+def create_app_engine(database_url):
+    bind = create_engine(database_url, **engine_options(database_url))
+    if bind.dialect.name == "sqlite":
+        event.listen(bind, "connect", set_sqlite_pragmas)
+    return bind
+
+def create_app_async_engine(database_url):
+    async_url = get_async_database_url(database_url)
+    bind = create_async_engine(async_url, **engine_options(async_url, is_async=True))
+    if bind.dialect.name == "sqlite":
+        event.listen(bind.sync_engine, "connect", set_sqlite_pragmas)
+    return bind
+
+# sync engine: migrations, CLI commands and scripts
+engine = create_app_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async engine: request handlers
+async_engine = create_app_async_engine(settings.database_url)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +162,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,57 @@
+from fastapi import Depends, status, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, queries
+from .database import get_async_db
+from .replicas import get_read_db
+
+# Path resolution
+# /users/{username}/posts/{puid} resolved with one users LEFT JOIN posts
+# query. A missing user and a missing post are told apart by the NULL side
+# of the join, so both 404s cost the same single round trip. Tombstoned
+# users and posts resolve as missing.
+
+async def resolve_post(db: AsyncSession, username: str, puid: int, options=()):
+    post_query = (
+        select(models.UserModel.id, models.PostModel)
+        .outerjoin(
+            models.PostModel,
+            (models.PostModel.owner_id == models.UserModel.id) &
+            (models.PostModel.puid == puid) &
+            models.PostModel.deleted_at.is_(None)
+        )
+        .where((models.UserModel.username == username) & models.UserModel.deleted_at.is_(None))
+        .options(*options)
+    )
+    row = (await db.execute(post_query)).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"username {username} not found!"
+        )
+    if row.PostModel is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post id {puid} not found!"
+        )
+    return row.PostModel
+
+async def resolve_posts(db: AsyncSession, targets):
+    """Post ids for many (username, puid) targets in one IN query, missing targets left out."""
+    posts_query = (
+        select(models.PostModel.id, models.PostModel.puid, models.UserModel.username)
+        .join(models.UserModel, models.UserModel.id == models.PostModel.owner_id)
+        .where(models.PostModel.puid.in_({puid for _, puid in targets}) & models.PostModel.deleted_at.is_(None))
+    )
+    return {(row.username, row.puid): row.id for row in await db.execute(posts_query)}
+
+async def get_post(username: str, puid: int, db: AsyncSession = Depends(get_async_db)):
+    return await resolve_post(db, username, puid)
+
+async def get_post_for_response(username: str, puid: int, db: AsyncSession = Depends(get_async_db)):
+    """Same as `get_post`, with everything `schemas.GetPost` serializes loaded."""
+    return await resolve_post(db, username, puid, options=queries.post_options())
+
+async def get_read_post(username: str, puid: int, db: AsyncSession = Depends(get_read_db)):
+    return await resolve_post(db, username, puid)
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import Float, Integer, bindparam, func, insert, select, update
+
+from . import leases, models
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Feed ranking
+# post_feed keeps one row per post with its vote sum, comment count and a
+# decay factor, score = (vote_sum + feed_comment_weight * comment_count) * decay.
+# Writes refresh the counters of the posts they touch with refresh_statement.
+# decay = 1 / (age_hours + 2) ** feed_gravity only moves with time, so it is
+# recomputed for every post by a background loop every feed_recompute_seconds,
+# in the one worker holding the feed_decay lease.
+# GET /feed reads the (score, post_id) index and never touches other users.
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+def decay_factor(created_at, now):
+    # `now` is naive UTC, PostgreSQL hands back aware timestamps in the session's zone
+    if created_at.tzinfo:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    return 1 / (age_hours + 2) ** settings.feed_gravity
+
+def new_feed(now=None):
+    """post_feed row of a post created `now`."""
+    now = now or datetime.utcnow()
+    return models.PostFeedModel(vote_sum=0, comment_count=0, decay=decay_factor(now, now), score=0.0)
+
+def refresh_statement(post_ids=None):
+    """UPDATE recounting vote_sum and comment_count, every post when `post_ids` is None."""
+    feed, stats, comment = models.PostFeedModel, models.PostVoteStatsModel, models.PostCommentModel
+    vote_sum = func.coalesce(
+        select(stats.vote_sum).where(stats.post_id == feed.post_id).scalar_subquery(), 0
+    )
+    comment_count = select(func.count(comment.id)).where(comment.post_id == feed.post_id).scalar_subquery()
+    statement = update(feed).values(
+        vote_sum=vote_sum,
+        comment_count=comment_count,
+        score=(vote_sum + settings.feed_comment_weight * comment_count) * feed.decay,
+    )
+    if post_ids is not None:
+        statement = statement.where(feed.post_id.in_(post_ids))
+    return statement.execution_options(synchronize_session=False)
+
+def missing_rows_statement():
+    """INSERT ... SELECT a post_feed row for every post without one."""
+    feed, post = models.PostFeedModel, models.PostModel
+    source = (
+        select(post.id, 0, 0, 0.0, 0.0)
+        .where(post.deleted_at.is_(None) & ~select(feed.post_id).where(feed.post_id == post.id).exists())
+    )
+    return insert(feed).from_select(["post_id", "vote_sum", "comment_count", "decay", "score"], source)
+
+def decay_statement():
+    """UPDATE for executemany with feed_post_id and decay per post."""
+    feed = models.PostFeedModel.__table__.c
+    decay = bindparam("decay", type_=Float)
+    return (
+        update(models.PostFeedModel.__table__)
+        .where(feed.post_id == bindparam("feed_post_id", type_=Integer))
+        .values(decay=decay, score=(feed.vote_sum + settings.feed_comment_weight * feed.comment_count) * decay)
+    )
+
+def decay_batches_query(after_id):
+    return (
+        select(models.PostModel.id, models.PostModel.created_at)
+        .where(models.PostModel.id > after_id)
+        .order_by(models.PostModel.id)
+        .limit(RECOMPUTE_BATCH_SIZE)
+    )
+
+def decay_params(rows, now):
+    return [{"feed_post_id": row.id, "decay": decay_factor(row.created_at, now)} for row in rows]
+
+async def recompute_decay(sessionmaker):
+    """Move every post's decay to now, RECOMPUTE_BATCH_SIZE posts per transaction."""
+    now, after_id = datetime.utcnow(), 0
+    while True:
+        async with sessionmaker() as db:
+            rows = (await db.execute(decay_batches_query(after_id))).all()
+            if not rows:
+                return
+            await db.execute(decay_statement(), decay_params(rows, now))
+            await db.commit()
+        after_id = rows[-1].id
+
+async def run_decay_loop(sessionmaker):
+    while True:
+        try:
+            # outlives the sleep, so the holder renews it before anyone else can take it
+            if await leases.acquire(sessionmaker, "feed_decay", settings.feed_recompute_seconds * 2):
+                await recompute_decay(sessionmaker)
+        except Exception:
+            logger.exception("feed decay recompute failed!")
+        await asyncio.sleep(settings.feed_recompute_seconds)
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from . import utils
+from .config import settings
+
+# Password hashing off the request path
+# hashing runs in a dedicated, size limited process pool so a login storm
+# cannot hold the GIL. Past hash_max_pending in-flight hashes callers get a
+# fast 503 instead of queueing behind the pool.
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=16):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="server busy, try again!",
+                headers={"Retry-After": "1"}
+            )
+        self.pending += 1
+        try:
+            if not self.workers:
+                return await run_in_threadpool(func, *args)
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash_password(self, password):
+        return await self.run(utils.hash_password, password)
+
+    async def verify_and_update_password(self, password, hashed_password):
+        return await self.run(utils.verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(workers=settings.hash_workers, max_pending=settings.hash_max_pending)
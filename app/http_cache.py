@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+from sqlalchemy import update
+
+from . import models
+from .config import settings
+
+# Conditional GETs
+# strong ETags built from a row's version counter and modified_at. A request
+# carrying If-None-Match / If-Modified-Since is checked against a version-only
+# lookup first and answered with 304 before the object graph is loaded.
+
+def make_etag(kind, id, version, modified_at, page=None):
+    """ETag of a row's representation; `page` tells the pages of a listing under one row apart."""
+    stamp = int(_as_utc(modified_at).timestamp() * 1_000_000) if modified_at else 0
+    if page is None:
+        return f'"{kind}{id}-{version}-{stamp}"'
+    return f'"{kind}{id}-{version}-{stamp}-{hashlib.blake2b(page.encode(), digest_size=6).hexdigest()}"'
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def is_conditional(request: Request):
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def not_modified(request: Request, etag, modified_at):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified_at:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(modified_at).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def set_cache_headers(request: Request, response: Response, etag, modified_at):
+    response.headers["ETag"] = etag
+    if modified_at:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(modified_at), usegmt=True)
+    if "authorization" in request.headers:
+        response.headers["Cache-Control"] = settings.http_cache_control_private
+    else:
+        response.headers["Cache-Control"] = settings.http_cache_control
+
+def not_modified_response(request: Request, etag, modified_at):
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(request, response, etag, modified_at)
+    return response
+
+def bump_posts(post_ids):
+    """Statement moving the ETag of every post in `post_ids`: votes and comments are part of GetPost."""
+    return (
+        update(models.PostModel)
+        .where(models.PostModel.id.in_(post_ids))
+        .values(version=models.PostModel.version + 1, modified_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
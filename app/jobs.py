@@ -0,0 +1,228 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Background jobs
+# request handlers commit their primary write and enqueue the follow-up work
+# (counters, search index, fan-out after deletes) as jobs. OutboxBackend
+# stores jobs in the app database inside the caller's transaction, so a job
+# exists exactly when its write committed. A worker claims due jobs, runs
+# each in its own session and retries failures with exponential backoff;
+# after jobs_max_attempts a job is kept as "failed". Handlers must be
+# idempotent: a job whose worker dies mid-run is claimed again once its
+# lease of jobs_lease_seconds runs out. Long jobs call job_queue.renew before
+# each commit, which extends the lease in the same transaction and stops the
+# job with LeaseLost when another worker has claimed it meanwhile.
+
+class LeaseLost(Exception):
+    pass
+
+class JobBackend:
+    """Where jobs wait: enqueue within the caller's session, claim/complete/retry/fail from a worker.
+
+    A broker backend would buffer in enqueue and publish after the commit.
+    """
+    async def enqueue(self, db, name, payload):
+        raise NotImplementedError
+
+    async def claim(self, limit):
+        raise NotImplementedError
+
+    async def renew(self, db, job):
+        """Extend the lease of `job` in `db`'s transaction, False when it was claimed again since."""
+        raise NotImplementedError
+
+    async def complete(self, job):
+        raise NotImplementedError
+
+    async def retry(self, job, error, run_at):
+        raise NotImplementedError
+
+    async def fail(self, job, error):
+        raise NotImplementedError
+
+class OutboxBackend(JobBackend):
+    def __init__(self, sessionmaker):
+        self.sessionmaker = sessionmaker
+
+    async def enqueue(self, db, name, payload):
+        db.add(models.JobModel(name=name, payload=payload))
+
+    async def claim(self, limit):
+        job = models.JobModel
+        now = datetime.utcnow()
+        async with self.sessionmaker() as db:
+            due = (
+                select(job.id)
+                .where((job.status == "pending") & (job.run_at <= now))
+                .order_by(job.run_at, job.id)
+                .limit(limit)
+            )
+            if db.bind.dialect.name == "postgresql":
+                due = due.with_for_update(skip_locked=True)
+            # the lease: a claimed job is due again if nobody completes it in time
+            claim_query = (
+                update(job)
+                .where(job.id.in_(due.scalar_subquery()))
+                .values(run_at=now + timedelta(seconds=settings.jobs_lease_seconds), attempts=job.attempts + 1)
+                .returning(job.id, job.name, job.payload, job.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = (await db.execute(claim_query)).all()
+            await db.commit()
+        return sorted(claimed, key=lambda row: row.id)
+
+    async def renew(self, db, job):
+        # attempts went up if another worker claimed the job after our lease ran out
+        renew_query = (
+            update(models.JobModel)
+            .where((models.JobModel.id == job.id) & (models.JobModel.attempts == job.attempts))
+            .values(run_at=datetime.utcnow() + timedelta(seconds=settings.jobs_lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        return (await db.execute(renew_query)).rowcount == 1
+
+    async def _update(self, job_id, **values):
+        async with self.sessionmaker() as db:
+            await db.execute(
+                update(models.JobModel)
+                .where(models.JobModel.id == job_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def complete(self, job):
+        async with self.sessionmaker() as db:
+            await db.execute(delete(models.JobModel).where(models.JobModel.id == job.id))
+            await db.commit()
+
+    async def retry(self, job, error, run_at):
+        await self._update(job.id, run_at=run_at, last_error=error)
+
+    async def fail(self, job, error):
+        await self._update(job.id, status="failed", last_error=error)
+
+class JobQueue:
+    def __init__(self, backend, sessionmaker):
+        self.backend = backend
+        self.sessionmaker = sessionmaker
+        self.handlers = {}
+        self._wakeup = None
+        self._stopping = False
+        self._current = ContextVar("current_job", default=None)
+
+    def job(self, name):
+        """Register `handler(db, **payload)` as the job `name`."""
+        def register(handler):
+            self.handlers[name] = handler
+            return Job(self, name)
+        return register
+
+    async def enqueue(self, db, name, payload):
+        if name not in self.handlers:
+            raise ValueError(f"unknown job {name}!")
+        await self.backend.enqueue(db, name, payload)
+        # wake the in-process worker once the caller commits
+        db.sync_session.info["jobs_enqueued"] = True
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self):
+        """Make `run` return once the job in progress is done."""
+        self._stopping = True
+        self.notify()
+
+    async def renew(self, db):
+        """Extend the running job's lease along with `db`'s next commit, raise LeaseLost when it is gone."""
+        job = self._current.get()
+        if job is not None and not await self.backend.renew(db, job):
+            raise LeaseLost(f"job {job.name} #{job.id} was claimed again!")
+
+    async def run_job(self, job):
+        handler = self.handlers.get(job.name)
+        current = self._current.set(job)
+        try:
+            if handler is None:
+                raise LookupError(f"unknown job {job.name}!")
+            async with self.sessionmaker() as db:
+                await handler(db, **job.payload)
+                await db.commit()
+        except LeaseLost as exc:
+            # the worker holding the new claim completes or retries it
+            logger.warning("%s", exc)
+            return False
+        except Exception as exc:
+            error = repr(exc)
+            if job.attempts >= settings.jobs_max_attempts:
+                logger.error("job %s #%s failed! %s", job.name, job.id, error)
+                await self.backend.fail(job, error)
+            else:
+                delay = settings.jobs_retry_seconds * 2 ** (job.attempts - 1)
+                await self.backend.retry(job, error, datetime.utcnow() + timedelta(seconds=delay))
+            return False
+        finally:
+            self._current.reset(current)
+        await self.backend.complete(job)
+        return True
+
+    async def run_pending(self, limit=None):
+        """Run one batch of due jobs, return how many were claimed."""
+        claimed = await self.backend.claim(limit or settings.jobs_batch_size)
+        for job in claimed:
+            if self._stopping:
+                # hand the rest back instead of leaving it leased
+                await self.backend.retry(job, "worker stopped", datetime.utcnow())
+                continue
+            await self.run_job(job)
+        return len(claimed)
+
+    async def drain(self):
+        """Run due jobs until none are left, retries scheduled later excluded."""
+        while await self.run_pending():
+            pass
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        while not self._stopping:
+            # cleared before claiming, a commit during the batch wakes the next wait
+            self._wakeup.clear()
+            try:
+                claimed = await self.run_pending()
+            except Exception:
+                logger.exception("job worker failed!")
+                claimed = 0
+            if claimed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.jobs_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+class Job:
+    def __init__(self, queue, name):
+        self.queue = queue
+        self.name = name
+
+    async def enqueue(self, db, **payload):
+        """Add the job to `db`'s transaction, it runs after the commit."""
+        await self.queue.enqueue(db, self.name, payload)
+
+job_queue = JobQueue(OutboxBackend(AsyncSessionLocal), AsyncSessionLocal)
+
+@event.listens_for(Session, "after_commit")
+def notify_worker(session):
+    if session.info.pop("jobs_enqueued", False):
+        job_queue.notify()
@@ -0,0 +1,43 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import models
+
+# Leases
+# a named lease in the app database lets one process out of every worker run
+# a periodic task. acquire() takes a free or expired lease, or renews it for
+# its holder, in a single UPDATE, so two processes never both get it. A
+# holder that dies loses the lease once it expires.
+
+INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def holder_id():
+    # computed per call, forked workers must not share their parent's id
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+async def acquire(sessionmaker, name, seconds, holder=None):
+    """Take or renew the lease `name` for `seconds`, return whether `holder` has it."""
+    lease, holder, now = models.LeaseModel, holder or holder_id(), datetime.utcnow()
+    async with sessionmaker() as db:
+        dialect_name = db.bind.dialect.name
+        if dialect_name not in INSERT_DIALECTS:
+            raise ValueError(f"leases are not supported on {dialect_name}!")
+        await db.execute(
+            INSERT_DIALECTS[dialect_name](lease)
+            .values(name=name, holder="", expires_at=now)
+            .on_conflict_do_nothing(index_elements=[lease.name])
+        )
+        result = await db.execute(
+            update(lease)
+            .where((lease.name == name) & ((lease.expires_at <= now) | (lease.holder == holder)))
+            .values(holder=holder, expires_at=now + timedelta(seconds=seconds))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount == 1
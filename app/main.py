@@ -1,25 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from . import models
-from .database import engine
-from .routers import root, user, post, auth, votes, comments
+from .admission import AdmissionMiddleware
+from .compression import CompressionMiddleware
+from .database import engine, AsyncSessionLocal
+from .feed import run_decay_loop
+from .hashing import password_hasher
+from .jobs import job_queue
+from .metrics import record_timing
+from .rate_limit import RateLimitMiddleware
+from .replicas import replica_router, track_writes
+from .response_cache import run_sync_loop
+from .responses import AppJSONResponse
+from .routers import root, user, post, auth, votes, comments, batch, export, feed, search, deletions
 from .config import settings
 
 # run command
 # uvicorn app.main:app --port 5000 --reload
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    decay_task = job_task = sync_task = None
+    if settings.feed_recompute_seconds > 0:
+        decay_task = asyncio.create_task(run_decay_loop(AsyncSessionLocal))
+    if settings.response_cache_sync_seconds > 0:
+        sync_task = asyncio.create_task(run_sync_loop(AsyncSessionLocal))
+    # run jobs in the app, or set jobs_in_process=false and run python -m app.cli worker
+    if settings.jobs_in_process:
+        job_task = asyncio.create_task(job_queue.run())
+    yield
+    if decay_task is not None:
+        decay_task.cancel()
+    if sync_task is not None:
+        sync_task.cancel()
+    if job_task is not None:
+        # cancelling mid statement strands the job's connection, let the job finish
+        job_queue.stop()
+        await asyncio.wait([job_task], timeout=settings.jobs_shutdown_seconds)
+        job_task.cancel()
+    password_hasher.shutdown()
+    await replica_router.dispose()
+
 # models.Base.metadata.create_all(bind=engine)
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=AppJSONResponse)
 
 origins = settings.allowed_origins.split(",")
 
+app.add_middleware(CompressionMiddleware)
+app.middleware("http")(track_writes)
+# shed and throttle before any work, inside record_timing so rejections are metered
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.middleware("http")(record_timing)
+# outermost, so every response gets CORS headers, the 429s and 503s above
+# included, and browsers let the frontend read their status and Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 print(f"running app in {settings.environment}")
@@ -29,4 +73,9 @@ app.include_router(user.router, prefix="/api/v1", tags=["Users"])
 app.include_router(post.router, prefix="/api/v1", tags=["User Posts"])
 app.include_router(votes.router, prefix="/api/v1", tags=["Post Votes"])
 app.include_router(comments.router, prefix="/api/v1", tags=["Post Comments"])
+app.include_router(feed.router, prefix="/api/v1", tags=["Feed"])
+app.include_router(search.router, prefix="/api/v1", tags=["Search"])
+app.include_router(batch.router, prefix="/api/v1", tags=["Batch"])
+app.include_router(export.router, prefix="/api/v1", tags=["Export"])
+app.include_router(deletions.router, prefix="/api/v1", tags=["Deletions"])
 app.include_router(auth.router, tags=["Auth"])
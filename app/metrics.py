@@ -0,0 +1,238 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from fastapi import Request
+from sqlalchemy import event
+
+from .admission import load_metrics
+from .config import settings
+from .database import async_engine, engine, pool_metrics
+from .oauth2 import token_cache, user_cache
+from .response_cache import response_cache
+from .slow_queries import slow_query_log
+
+# Request metrics
+# record_timing times every request into a latency histogram per route and,
+# through cursor events on every engine, counts the SQL statements and DB time
+# each request spends. Both go out as a Server-Timing header and are exposed
+# in Prometheus text format by GET /metrics.
+
+class RequestStats:
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self):
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        return f'{self.scope["method"]} {route.path if route else self.scope["path"]}'
+
+# the stats of the request being handled, None outside of requests
+current_request = ContextVar("current_request", default=None)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.slow_query_ms:
+        slow_query_log.observe(conn, statement, parameters, executemany, elapsed, stats.route if stats else None)
+
+def handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+def instrument_engine(bind):
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    event.listen(bind, "after_cursor_execute", after_cursor_execute)
+    event.listen(bind, "handle_error", handle_error)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+class RouteMetrics:
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # (method, route, status) -> [bucket counts, count, seconds, statements, db seconds]
+        self.routes = {}
+
+    def observe(self, method, route, status, seconds, stats):
+        with self._lock:
+            entry = self.routes.setdefault((method, route, status), [[0] * len(self.buckets), 0, 0.0, 0, 0.0])
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += seconds
+            entry[3] += stats.statements
+            entry[4] += stats.db_seconds
+
+    def exposition(self):
+        """Prometheus text format of the route metrics, pool checkout waits, caches and load shedding."""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency per route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = {key: (list(value[0]), *value[1:]) for key, value in self.routes.items()}
+        for (method, route, status), (bucket_counts, count, seconds, _, _) in sorted(routes.items()):
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {seconds}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+        lines += [
+            "# HELP http_request_db_statements_total SQL statements executed per route.",
+            "# TYPE http_request_db_statements_total counter",
+        ]
+        for (method, route, status), value in sorted(routes.items()):
+            lines.append(f'http_request_db_statements_total{{method="{method}",route="{route}",status="{status}"}} {value[3]}')
+        lines += [
+            "# HELP http_request_db_seconds_total Time spent in SQL statements per route.",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        for (method, route, status), value in sorted(routes.items()):
+            lines.append(f'http_request_db_seconds_total{{method="{method}",route="{route}",status="{status}"}} {value[4]}')
+        pool = pool_metrics.snapshot()
+        lines += [
+            "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+            "# TYPE db_pool_checkout_wait_seconds histogram",
+        ]
+        for bound, bucket_count in pool["wait_seconds_buckets"].items():
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{le="{bound}"}} {bucket_count}')
+        lines.append(f'db_pool_checkout_wait_seconds_bucket{{le="+Inf"}} {pool["checkouts"]}')
+        lines.append(f'db_pool_checkout_wait_seconds_sum {pool["wait_seconds_total"]}')
+        lines.append(f'db_pool_checkout_wait_seconds_count {pool["checkouts"]}')
+        lines += [
+            "# HELP db_pool_checkout_timeouts_total Pool checkouts that timed out.",
+            "# TYPE db_pool_checkout_timeouts_total counter",
+            f'db_pool_checkout_timeouts_total {pool["timeouts"]}',
+            "# HELP db_pool_checkout_waiting Requests waiting for a pooled connection.",
+            "# TYPE db_pool_checkout_waiting gauge",
+            f'db_pool_checkout_waiting {pool["waiting"]}',
+        ]
+        caches = cache_stats()
+        for name, kind, help_text in (
+            ("hits", "counter", "Cache lookups answered from the cache."),
+            ("misses", "counter", "Cache lookups that went to the source."),
+            ("size", "gauge", "Entries held by a per-process cache."),
+        ):
+            metric = f"cache_{name}_total" if kind == "counter" else f"cache_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for cache, stats in caches.items():
+                if name in stats:
+                    lines.append(f'{metric}{{cache="{cache}"}} {stats[name]}')
+        load = load_metrics.snapshot()
+        lines += [
+            "# HELP http_requests_in_flight Requests admitted and in progress.",
+            "# TYPE http_requests_in_flight gauge",
+            f'http_requests_in_flight {load["in_flight"]}',
+            "# HELP http_requests_shed_total Requests refused with 503 by admission control.",
+            "# TYPE http_requests_shed_total counter",
+            f'http_requests_shed_total {load["shed"]}',
+            "# HELP http_requests_rate_limited_total Requests refused with 429 by rate limiting.",
+            "# TYPE http_requests_rate_limited_total counter",
+            f'http_requests_rate_limited_total {load["rate_limited"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+route_metrics = RouteMetrics()
+
+def cache_stats():
+    """Hit and miss counters of the user, token and response caches."""
+    return {
+        "user": user_cache.stats(),
+        "token": token_cache.stats(),
+        "response": response_cache.backend.stats(),
+    }
+
+# Sampling profiler
+# opt-in with settings.profile_enabled, then per request through an
+# "X-Profile: 1" header or at random with settings.profile_sample_rate. A
+# thread samples the event loop thread's stack every profile_interval_ms and
+# requests slower than profile_slow_ms (or asked for by header) are written
+# to profile_dir as folded stacks, ready for flamegraph.pl or speedscope.
+# The loop thread serves every request, so concurrent work shows up too.
+
+class StackSampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+def write_profile(request: Request, stacks, seconds):
+    directory = Path(settings.profile_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = request.url.path.strip("/").replace("/", "_") or "root"
+    path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{name}-{int(seconds * 1000)}ms.folded"
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+    return path
+
+def wants_profile(request: Request):
+    if not settings.profile_enabled:
+        return False
+    return request.headers.get("x-profile") == "1" or random.random() < settings.profile_sample_rate
+
+async def record_timing(request: Request, call_next):
+    """Middleware timing the request, its SQL, and profiling it when asked to."""
+    stats = RequestStats(request.scope)
+    token = current_request.set(stats)
+    sampler = None
+    if wants_profile(request):
+        sampler = StackSampler(threading.get_ident(), settings.profile_interval_ms / 1000).start()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - started
+        current_request.reset(token)
+        if sampler is not None:
+            stacks = sampler.stop()
+            if request.headers.get("x-profile") == "1" or elapsed * 1000 >= settings.profile_slow_ms:
+                write_profile(request, stacks, elapsed)
+    route = request.scope.get("route")
+    route_metrics.observe(request.method, route.path if route else "unmatched", response.status_code, elapsed, stats)
+    response.headers["Server-Timing"] = (
+        f"app;dur={elapsed * 1000:.1f}, "
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} statements"'
+    )
+    return response
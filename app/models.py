@@ -1,6 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, JSON, String, Enum
+from sqlalchemy.orm import query_expression, relationship
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
@@ -16,12 +16,20 @@ class UserModel(Base):
     email = Column(String, nullable=False, unique=True, index=True)
     hashed_password = Column(String, nullable=False)
     verified_user = Column(Boolean, default=False)
-    modified_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow())
-    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow())
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    modified_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # tombstone, set on delete until the purge job removes the row
+    deleted_at = Column(TIMESTAMP(timezone=True), default=None)
 
-    posts = relationship("PostModel", back_populates="owner", cascade="all, delete-orphan", lazy=True)
-    post_votes = relationship("PostVoteModel", back_populates="user", cascade="all, delete-orphan", lazy=True)
-    post_comments = relationship("PostCommentModel", back_populates="user", cascade="all, delete-orphan", lazy=True)
+    # children go with ON DELETE CASCADE, never loaded into the session to be deleted
+    posts = relationship("PostModel", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    post_votes = relationship("PostVoteModel", back_populates="user", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    post_comments = relationship("PostCommentModel", back_populates="user", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
 class PostModel(Base):
     __tablename__ = "posts"
@@ -31,14 +39,25 @@ class PostModel(Base):
     puid = Column(Integer, nullable=False, unique=True)
     title = Column(String, nullable=False)
     description = Column(String, default=None)
-    modified_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow())
-    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow())
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    modified_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    deleted_at = Column(TIMESTAMP(timezone=True), default=None)
 
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     owner = relationship("UserModel", back_populates="posts")
 
-    post_votes = relationship("PostVoteModel", back_populates="post", cascade="all, delete-orphan", lazy=True)
-    post_comments = relationship("PostCommentModel", back_populates="post", cascade="all, delete-orphan", lazy=True)
+    post_votes = relationship("PostVoteModel", back_populates="post", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    post_comments = relationship("PostCommentModel", back_populates="post", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    score = relationship("PostVoteStatsModel", back_populates="post", cascade="all, delete-orphan", uselist=False, passive_deletes=True, lazy=True)
+    feed = relationship("PostFeedModel", back_populates="post", cascade="all, delete-orphan", uselist=False, passive_deletes=True, lazy=True)
+    # relevance of the post in full-text search results, loaded with with_expression()
+    search_rank = query_expression()
+
+    __table_args__ = (
+        Index("ix_posts_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_posts_owner_id_puid", "owner_id", "puid"),
+    )
 
 class PostVoteModel(Base):
     __tablename__ = "post_votes"
@@ -46,20 +65,116 @@ class PostVoteModel(Base):
     id = Column(Integer, primary_key=True)
 
     vote = Column(Integer, default=0)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
 
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     post = relationship("PostModel", back_populates="post_votes")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user = relationship("UserModel", back_populates="post_votes")
 
+    __table_args__ = (
+        Index("ix_post_votes_post_id_created_at_id", "post_id", "created_at", "id"),
+        Index("ix_post_votes_post_id_user_id", "post_id", "user_id", unique=True),
+        Index("ix_post_votes_user_id", "user_id"),
+    )
+
 class PostCommentModel(Base):
     __tablename__ = "post_comments"
 
     id = Column(Integer, primary_key=True)
 
     comment = Column(String, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
 
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     post = relationship("PostModel", back_populates="post_comments")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user = relationship("UserModel", back_populates="post_comments")
+
+    __table_args__ = (
+        Index("ix_post_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+        Index("ix_post_comments_user_id", "user_id"),
+    )
+
+class PostVoteStatsModel(Base):
+    __tablename__ = "post_vote_stats"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    post = relationship("PostModel", back_populates="score")
+
+    vote_count = Column(Integer, nullable=False, default=0)
+    vote_sum = Column(Integer, nullable=False, default=0)
+    votes_0 = Column(Integer, nullable=False, default=0)
+    votes_1 = Column(Integer, nullable=False, default=0)
+    votes_2 = Column(Integer, nullable=False, default=0)
+    votes_3 = Column(Integer, nullable=False, default=0)
+    votes_4 = Column(Integer, nullable=False, default=0)
+    votes_5 = Column(Integer, nullable=False, default=0)
+
+    @property
+    def average(self):
+        return round(self.vote_sum / self.vote_count, 2) if self.vote_count else 0.0
+
+    @property
+    def histogram(self):
+        return [getattr(self, f"votes_{value}") for value in range(6)]
+
+class PostFeedModel(Base):
+    __tablename__ = "post_feed"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    post = relationship("PostModel", back_populates="feed")
+
+    vote_sum = Column(Integer, nullable=False, default=0)
+    comment_count = Column(Integer, nullable=False, default=0)
+    decay = Column(Float, nullable=False, default=1.0)
+    score = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_post_feed_score_post_id", "score", "post_id"),
+    )
+
+class JobModel(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, default=None)
+    run_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at_id", "status", "run_at", "id"),
+    )
+
+class DeletionModel(Base):
+    __tablename__ = "deletions"
+
+    id = Column(Integer, primary_key=True)
+
+    kind = Column(String, nullable=False)
+    # the user or post being purged, no foreign key: the row goes away
+    target_id = Column(Integer, nullable=False)
+    # the user who asked for it, the only one besides the admin who may read it
+    owner_id = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    finished_at = Column(TIMESTAMP(timezone=True), default=None)
+
+class CacheGenerationModel(Base):
+    __tablename__ = "cache_generations"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+class LeaseModel(Base):
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
@@ -1,14 +1,28 @@
-from datetime import datetime, timedelta
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from fastapi import Depends, status, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from . import schemas, models
-from .database import get_db
+from .cache import MemoryCache
+from .database import get_async_db
 from .config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+# operational endpoints (exports, metrics, status) take settings.admin_token
+# as a bearer token, they stay closed while it is unset
+admin_scheme = HTTPBearer(auto_error=False)
+
+# detached GetUser snapshots keyed by user id, swap for a shared
+# cache.CacheBackend to share entries across workers
+user_cache = MemoryCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
+# verified TokenData keyed by token digest, each entry lives until the token's exp
+token_cache = MemoryCache(maxsize=settings.token_cache_size, ttl=settings.access_token_expire_minutes * 60)
 
 def return_credential_exception():
     return HTTPException(
@@ -24,7 +38,14 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
+def token_digest(token: str):
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
 def verify_access_token(token: str, credentials_exception):
+    token_key = token_digest(token)
+    token_data = token_cache.get(token_key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=settings.algorithm)
         if not payload.get("user_id"):
@@ -32,13 +53,39 @@ def verify_access_token(token: str, credentials_exception):
         token_data = schemas.TokenData(**payload)
     except jwt.ExpiredSignatureError:
         raise credentials_exception
-    except jwt.InvalidTokenError:
-        raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if token_data.exp:
+        ttl = (token_data.exp - datetime.now(timezone.utc)).total_seconds()
+        if ttl > 0:
+            token_cache.set(token_key, token_data, ttl=ttl)
     return token_data
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     token_data = verify_access_token(token=token, credentials_exception=return_credential_exception())
-    current_user = db.query(models.UserModel).filter(models.UserModel.id == token_data.user_id).first()
+    current_user = user_cache.get(token_data.user_id)
+    if current_user is None:
+        result = await db.execute(select(models.UserModel).where((models.UserModel.id == token_data.user_id) & models.UserModel.deleted_at.is_(None)))
+        user = result.scalars().first()
+        if not user:
+            return None
+        current_user = schemas.GetUser.model_validate(user)
+        user_cache.set(token_data.user_id, current_user)
     return current_user
+
+def invalidate_user(user_id: int):
+    user_cache.delete(user_id)
+
+def is_admin(credentials: Optional[HTTPAuthorizationCredentials]):
+    return bool(
+        settings.admin_token
+        and credentials is not None
+        and secrets.compare_digest(credentials.credentials.encode(), settings.admin_token.encode())
+    )
+
+def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_scheme)):
+    if not is_admin(credentials):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not authorized!"
+        )
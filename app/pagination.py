@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import status, HTTPException
+from sqlalchemy import literal, tuple_
+
+# Keyset (cursor) pagination
+# cursors are opaque urlsafe base64 strings carrying the sort key of the
+# boundary row and the direction to move in, so every page is a single
+# indexed range scan no matter how deep the client is.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def invalid_cursor_exception():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="invalid cursor!"
+    )
+
+def encode_cursor(values, direction="next"):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps({"d": direction, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        direction, values = data["d"], data["k"]
+        if direction not in ("next", "prev") or len(values) != len(keys):
+            raise ValueError(cursor)
+        values = [
+            datetime.fromisoformat(value) if key.type.python_type is datetime else key.type.python_type(value)
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise invalid_cursor_exception()
+    return direction, values
+
+async def paginate(db, statement, keys, limit=DEFAULT_LIMIT, cursor=None, descending=False):
+    """Return one page of `statement` ordered by `keys` plus the cursors around it."""
+    direction, values = "next", None
+    if cursor:
+        direction, values = decode_cursor(cursor, keys)
+    backwards = direction == "prev"
+    # walking backwards through a descending listing is an ascending scan
+    ascending = descending == backwards
+    if values is not None:
+        row_key = tuple_(*keys)
+        boundary = tuple_(*[literal(value, key.type) for key, value in zip(keys, values)])
+        statement = statement.where(row_key > boundary if ascending else row_key < boundary)
+    order = [key.asc() if ascending else key.desc() for key in keys]
+    result = await db.execute(statement.order_by(*order).limit(limit + 1))
+    rows = list(result.scalars().all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    def key_of(row):
+        return [getattr(row, key.key) for key in keys]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = encode_cursor(key_of(rows[-1]), "next")
+        if (has_more and backwards) or (cursor and not backwards):
+            prev_cursor = encode_cursor(key_of(rows[0]), "prev")
+    return {"items": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor, "limit": limit}
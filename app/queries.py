@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload, subqueryload, load_only
+
+from . import models
+from .database import async_engine
+
+# Query shaping
+# loader options matching what the response schemas actually serialize, so
+# listing N posts costs a constant number of statements instead of 1 + 3N.
+
+LOADERS = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "subquery": subqueryload,
+}
+
+def _loader(strategy, attribute):
+    if strategy not in LOADERS:
+        raise ValueError(f"unknown loader strategy {strategy}! Choices: {list(LOADERS)}")
+    return LOADERS[strategy](attribute)
+
+def post_options(owner="joined", score="joined", comments="selectin"):
+    """Loader options for serializing `schemas.GetPost`."""
+    return [
+        load_only(
+            models.PostModel.id,
+            models.PostModel.puid,
+            models.PostModel.title,
+            models.PostModel.description,
+            models.PostModel.version,
+            models.PostModel.modified_at,
+            models.PostModel.created_at,
+            models.PostModel.owner_id,
+        ),
+        _loader(owner, models.PostModel.owner).load_only(
+            models.UserModel.id,
+            models.UserModel.username,
+        ),
+        _loader(score, models.PostModel.score),
+        _loader(comments, models.PostModel.post_comments).load_only(
+            models.PostCommentModel.id,
+            models.PostCommentModel.comment,
+        ),
+    ]
+
+def post_version_options():
+    """Just enough of a post to build its ETag."""
+    return [load_only(models.PostModel.id, models.PostModel.version, models.PostModel.modified_at)]
+
+@contextmanager
+def count_statements(bind=async_engine.sync_engine):
+    """Collect every SQL statement executed on `bind` inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+@contextmanager
+def assert_max_statements(limit, bind=async_engine.sync_engine):
+    """Fail when the block emits more than `limit` SQL statements."""
+    with count_statements(bind) as statements:
+        yield statements
+    assert len(statements) <= limit, (
+        f"expected at most {limit} statements, got {len(statements)}:\n" + "\n".join(statements)
+    )
@@ -0,0 +1,120 @@
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from fastapi import Request
+from starlette.routing import Match
+
+from .admission import load_metrics
+from .config import settings
+from .replicas import client_key
+from .responses import AppJSONResponse
+
+# Rate limiting
+# a token bucket per route and client: the bucket holds up to N tokens and
+# refills at N per period, every request takes one. The client is the
+# token's user when authenticated, else the client address (the same
+# client_key replica stickiness uses). Limits are "N/second|minute|hour"
+# strings per "METHOD /route/template" in settings.rate_limits, other routes
+# get rate_limit_default. A request without a token gets 429 with
+# Retry-After set to the seconds until the next token.
+# MemoryRateLimitStore keeps buckets per process. RedisRateLimitStore
+# shares them across workers through any client exposing eval, such as
+# redis.Redis or fakeredis.FakeRedis.
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+@lru_cache(maxsize=None)
+def parse_limit(limit):
+    """Limit like 10/minute as (capacity 10, refill rate in tokens per second)."""
+    count, _, period = limit.partition("/")
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"invalid rate limit {limit}!")
+    return int(count), int(count) / PERIODS[period]
+
+class RateLimitStore:
+    def take(self, key, capacity, rate):
+        """Take a token from the bucket `key`, return 0 or the seconds until one is available."""
+        raise NotImplementedError
+
+class MemoryRateLimitStore(RateLimitStore):
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        # key -> (tokens, refilled at)
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, refilled_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - refilled_at) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if tokens >= 1 else tokens, now)
+            self._buckets.move_to_end(key)
+            # the least recently seen clients go first, their buckets were full again anyway
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+class RedisRateLimitStore(RateLimitStore):
+    # refill and take in one round trip, atomic across workers
+    script = """
+        local bucket = redis.call("HMGET", KEYS[1], "tokens", "refilled_at")
+        local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local tokens = tonumber(bucket[1]) or capacity
+        local refilled_at = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(now - refilled_at, 0) * rate)
+        local wait = 0
+        if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+        redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "refilled_at", tostring(now))
+        redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, client, prefix="ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, capacity, rate):
+        wait = self.client.eval(self.script, 1, f"{self.prefix}:{key}", capacity, rate, time.time())
+        return float(wait)
+
+def route_template(scope):
+    """METHOD /route/template of the route serving `scope`, None when nothing matches."""
+    for route in scope["app"].router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            # record_timing reports rejected requests under their route too
+            scope.update(child_scope)
+            return f'{scope["method"]} {route.path}'
+    return None
+
+class RateLimitMiddleware:
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store if store is not None else rate_limit_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            await self.app(scope, receive, send)
+            return
+        route = route_template(scope)
+        limit = settings.rate_limits.get(route, settings.rate_limit_default) if route else None
+        if limit:
+            capacity, rate = parse_limit(limit)
+            wait = self.store.take(f"{route}|{client_key(Request(scope))}", capacity, rate)
+            if wait:
+                load_metrics.rate_limited += 1
+                response = AppJSONResponse(
+                    {"detail": "rate limit exceeded!"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+# swap the store for RedisRateLimitStore to share limits across workers
+rate_limit_store = MemoryRateLimitStore(maxsize=settings.rate_limit_store_size)
@@ -0,0 +1,117 @@
+import itertools
+import time
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from . import oauth2, metrics
+from .cache import MemoryCache
+from .config import settings
+from .database import AsyncSessionLocal, create_app_async_engine
+
+# Read replica routing
+# GET handlers take get_read_db, which hands out sessions round-robin across
+# the healthy replicas in settings.replica_database_urls. A replica failing
+# a connection is skipped for replica_retry_seconds and re-checked with
+# SELECT 1 before it gets traffic again. A client that just wrote something
+# reads from the primary for replica_sticky_seconds so it sees its own writes.
+# Who wrote recently lives in a cache.CacheBackend: the default MemoryCache
+# only pins clients within one process, with several workers pass a shared
+# cache.RedisCache so the next request sticks whichever worker it lands on.
+
+class Replica:
+    def __init__(self, database_url):
+        self.engine = create_app_async_engine(database_url)
+        metrics.instrument_engine(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        # unknown until the first check
+        self.healthy = False
+        self.retry_at = 0.0
+
+    def mark_unhealthy(self):
+        self.healthy = False
+        self.retry_at = time.monotonic() + settings.replica_retry_seconds
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (DBAPIError, OSError):
+            self.mark_unhealthy()
+            return False
+        self.healthy = True
+        return True
+
+class ReplicaRouter:
+    def __init__(self, database_urls, sticky_seconds=5, recent_writers=None):
+        self.replicas = [Replica(url) for url in database_urls]
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self.sticky_seconds = sticky_seconds
+        # client key -> True while the client must read from the primary
+        self.recent_writers = recent_writers if recent_writers is not None else MemoryCache(maxsize=100000, ttl=sticky_seconds)
+
+    def mark_write(self, client_key):
+        self.recent_writers.set(client_key, True, ttl=self.sticky_seconds)
+
+    def is_recent_writer(self, client_key):
+        return bool(self.replicas and client_key and self.recent_writers.get(client_key))
+
+    async def choose(self, client_key=None):
+        if not self.replicas or self.is_recent_writer(client_key):
+            return None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next)]
+            if replica.healthy:
+                return replica
+            if replica.retry_at <= time.monotonic() and await replica.check():
+                return replica
+        return None
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+# pass recent_writers=cache.RedisCache(...) to share stickiness across workers
+replica_router = ReplicaRouter(
+    [url.strip() for url in settings.replica_database_urls.split(",") if url.strip()],
+    sticky_seconds=settings.replica_sticky_seconds,
+)
+
+def client_key(request: Request):
+    """Who is asking: the token's user when authenticated, else the client address."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"user:{oauth2.verify_access_token(token, oauth2.return_credential_exception()).user_id}"
+        except HTTPException:
+            pass
+    return f"ip:{request.client.host if request.client else None}"
+
+async def get_read_db(request: Request):
+    key = client_key(request)
+    # the response cache is skipped too, a replica may have filled it
+    request.state.recent_writer = replica_router.is_recent_writer(key)
+    replica = await replica_router.choose(key)
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    async with replica.sessionmaker() as db:
+        try:
+            yield db
+        except (OperationalError, InterfaceError):
+            replica.mark_unhealthy()
+            raise
+
+async def read_sessionmaker(request: Request):
+    """Session factory get_read_db would pick, for reads outliving the handler like streamed responses."""
+    replica = await replica_router.choose(client_key(request))
+    return replica.sessionmaker if replica else AsyncSessionLocal
+
+async def track_writes(request: Request, call_next):
+    """Middleware pinning a client to the primary right after a successful write."""
+    response = await call_next(request)
+    if replica_router.replicas and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        replica_router.mark_write(client_key(request))
+    return response
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from . import http_cache, models
+from .cache import MemoryCache
+from .config import settings
+from .leases import INSERT_DIALECTS
+
+logger = logging.getLogger(__name__)
+
+# Response cache
+# serialized JSON bodies of public GET endpoints, keyed by scope (the owner's
+# username), path and query string. Writes call invalidate(scope), which moves
+# the scope to a new generation so every older key is simply never read again
+# and ages out of the backend. Concurrent misses on one key share a single
+# render, so a hot post costs one query no matter how many requests wait on it.
+# A client get_read_db pinned to the primary after a write bypasses the cache,
+# an entry another client rendered from a lagging replica may miss its write.
+# Jobs run in another process (python -m app.cli worker) cannot reach this
+# process' cache: they bump the generation row in cache_generations within
+# their transaction, every key carries it and each web process re-reads it
+# every response_cache_sync_seconds, which drops every older entry at once.
+
+class ResponseCache:
+    def __init__(self, backend, name="response_cache"):
+        self.backend = backend
+        self.name = name
+        # last generation read from cache_generations
+        self.shared_generation = 0
+        self._inflight = {}
+
+    def _generation(self, scope):
+        generation = self.backend.get(f"gen:{scope}")
+        if generation is None:
+            generation = time.time_ns()
+            self.backend.set(f"gen:{scope}", generation, ttl=settings.response_cache_ttl * 10)
+        return generation
+
+    def key(self, scope, request: Request):
+        """Cache key for the request, None when it must read past the cache."""
+        if getattr(request.state, "recent_writer", False):
+            return None
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        return f"{scope}:{self.shared_generation}.{self._generation(scope)}:{request.url.path}?{query}"
+
+    def get(self, key):
+        return self.backend.get(key) if key is not None else None
+
+    async def get_or_render(self, key, render):
+        """Cached entry for `key`, rendering it once however many requests miss together."""
+        if key is None:
+            return await render()
+        while True:
+            entry = self.backend.get(key)
+            if entry is not None:
+                return entry
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            entry = await asyncio.shield(pending)
+            if entry is not None:
+                return entry
+            # the render was cancelled with its request, the next waiter takes over
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            entry = await render()
+        except asyncio.CancelledError:
+            pending.set_result(None)
+            raise
+        except Exception as exc:
+            pending.set_exception(exc)
+            # the waiters re-raise it, don't warn when there were none
+            pending.exception()
+            raise
+        else:
+            self.backend.set(key, entry)
+            pending.set_result(entry)
+        finally:
+            del self._inflight[key]
+        return entry
+
+    def invalidate(self, scope):
+        self.backend.set(f"gen:{scope}", time.time_ns(), ttl=settings.response_cache_ttl * 10)
+
+    def clear(self):
+        self.backend.clear()
+
+    async def invalidate_shared(self, db):
+        """Invalidate every entry in every process once `db` commits."""
+        table = models.CacheGenerationModel
+        bump = (
+            INSERT_DIALECTS[db.bind.dialect.name](table)
+            .values(name=self.name, generation=1)
+            .on_conflict_do_update(index_elements=[table.name], set_={"generation": table.generation + 1})
+            .returning(table.generation)
+        )
+        return (await db.execute(bump)).scalar_one()
+
+    async def sync(self, sessionmaker):
+        async with sessionmaker() as db:
+            generation = (await db.execute(
+                select(models.CacheGenerationModel.generation).where(models.CacheGenerationModel.name == self.name)
+            )).scalar()
+        self.shared_generation = generation or 0
+
+    def entry(self, model, etag=None, modified_at=None):
+        return {"body": model.model_dump_json().encode(), "etag": etag, "modified_at": modified_at}
+
+    def respond(self, request: Request, entry):
+        if entry["etag"] and http_cache.not_modified(request, entry["etag"], entry["modified_at"]):
+            return http_cache.not_modified_response(request, entry["etag"], entry["modified_at"])
+        response = Response(content=entry["body"], media_type="application/json")
+        if entry["etag"]:
+            http_cache.set_cache_headers(request, response, entry["etag"], entry["modified_at"])
+        return response
+
+# swap the backend for cache.RedisCache to share entries across workers
+response_cache = ResponseCache(MemoryCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl))
+
+async def run_sync_loop(sessionmaker):
+    while True:
+        try:
+            await response_cache.sync(sessionmaker)
+        except Exception:
+            logger.exception("response cache sync failed!")
+        await asyncio.sleep(settings.response_cache_sync_seconds)
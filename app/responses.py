@@ -0,0 +1,55 @@
+import asyncio
+import orjson
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+# JSON responses
+# AppJSONResponse is the app wide default, orjson instead of stdlib json.
+# Routers built with route_class=ModelJSONRoute go one step further: the
+# handler's return value is validated against response_model and dumped
+# straight to bytes by pydantic-core, skipping the dict FastAPI would build
+# and hand to the response class. A route opts out by naming a response_class
+# other than the app's AppJSONResponse, e.g. response_class=JSONResponse.
+
+class AppJSONResponse(ORJSONResponse):
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+class ModelJSONRoute(APIRoute):
+    def uses_default_response_class(self):
+        # include_router resolves the app's default_response_class into a
+        # concrete class, a placeholder is only left on routers not mounted yet
+        return isinstance(self.response_class, DefaultPlaceholder) or self.response_class is AppJSONResponse
+
+    def get_route_handler(self):
+        if (
+            self.response_model is not None
+            and self.uses_default_response_class()
+            and asyncio.iscoroutinefunction(self.dependant.call)
+        ):
+            self.dependant.call = self._serialize_response(self.dependant.call)
+        return super().get_route_handler()
+
+    def _serialize_response(self, endpoint):
+        adapter = TypeAdapter(self.response_model)
+        response_param_name = self.dependant.response_param_name
+        status_code = self.status_code
+
+        async def call(**values):
+            content = await endpoint(**values)
+            if isinstance(content, Response):
+                return content
+            body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+            response = Response(content=body, status_code=status_code or 200, media_type="application/json")
+            # headers and status the handler set on its injected Response
+            sub_response = values.get(response_param_name) if response_param_name else None
+            if sub_response is not None:
+                if sub_response.status_code:
+                    response.status_code = sub_response.status_code
+                response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        return call
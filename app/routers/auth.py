@@ -1,32 +1,41 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import models, schemas, utils, oauth2
-from ..database import get_db
+from .. import models, schemas, oauth2
+from ..database import get_async_db
+from ..hashing import password_hasher
+from ..responses import ModelJSONRoute
 
-router = APIRouter(prefix="/auth")
+router = APIRouter(prefix="/auth", route_class=ModelJSONRoute)
 
 @router.post("/token", response_model=schemas.AccessToken)
 # def generate_token(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-def generate_token(credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def generate_token(credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     cred_query = (
-        db.query(models.UserModel)
-        .filter(
-            (models.UserModel.username == credentials.username) | 
-            (models.UserModel.email == credentials.username)
+        select(models.UserModel)
+        .where(
+            ((models.UserModel.username == credentials.username) |
+            (models.UserModel.email == credentials.username)) &
+            models.UserModel.deleted_at.is_(None)
         )
     )
-    user = cred_query.first()
+    user = (await db.execute(cred_query)).scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"invalid credentials!"
         )
-    if not utils.verify_password(password=credentials.password, hashed_password=user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update_password(credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"invalid credentials!"
         )
+    if new_hash:
+        # legacy scheme or outdated rounds, store the hash from the current scheme
+        user.hashed_password = new_hash
+        await db.commit()
     access_token = oauth2.create_access_token(data={"user_id": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,92 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, oauth2, vote_stats, http_cache, tasks
+from ..database import get_async_db
+from ..dependencies import resolve_posts
+from ..response_cache import response_cache
+from ..responses import ModelJSONRoute
+
+router = APIRouter(prefix="/batch", route_class=ModelJSONRoute)
+
+# Batch API
+# up to settings.batch_max_items votes or comments across many posts in one
+# request: one IN query resolves every target, one set of bulk statements
+# writes them and a single commit covers the batch. Every item gets its own
+# result, an unknown post fails that item only. Longer batches fail schema
+# validation with 422 before any of their items is validated.
+
+def check_batch(current_user):
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not authorized!"
+        )
+
+def not_found(index, item):
+    return {"index": index, "status_code": status.HTTP_404_NOT_FOUND, "detail": f"Post id {item.puid} not found!"}
+
+@router.post("/votes", response_model=schemas.BatchVoteResults)
+async def batch_votes(batch: schemas.BatchVotes, db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+    check_batch(current_user)
+    post_ids = await resolve_posts(db, [(item.username, item.puid) for item in batch.items])
+    # one vote per post and user, the last one in the batch wins
+    new_votes = {}
+    for item in batch.items:
+        post_id = post_ids.get((item.username, item.puid))
+        if post_id is not None:
+            new_votes[post_id] = item.vote
+    post_votes = {}
+    if new_votes:
+        # counters first: they need the previous votes the upsert is about to replace
+        await db.execute(vote_stats.lock_stats(list(new_votes)))
+        old_votes = dict((await db.execute(vote_stats.previous_votes(list(new_votes), current_user.id))).all())
+        await db.execute(
+            vote_stats.record_votes(),
+            [vote_stats.vote_deltas(post_id, old_votes.get(post_id), vote) for post_id, vote in new_votes.items()]
+        )
+        upsert_query = vote_stats.upsert_votes(
+            db.bind.dialect.name,
+            [{"post_id": post_id, "user_id": current_user.id, "vote": vote} for post_id, vote in new_votes.items()]
+        )
+        post_votes = {post_vote.post_id: post_vote for post_vote in (await db.execute(upsert_query)).scalars()}
+        await db.execute(http_cache.bump_posts(list(new_votes)))
+        await tasks.refresh_posts.enqueue(db, post_ids=list(new_votes))
+        await db.commit()
+    results = []
+    for index, item in enumerate(batch.items):
+        post_id = post_ids.get((item.username, item.puid))
+        if post_id is None:
+            results.append(not_found(index, item))
+        else:
+            results.append({"index": index, "status_code": status.HTTP_200_OK, "vote": post_votes[post_id]})
+    for username in {username for username, _ in post_ids}:
+        response_cache.invalidate(username)
+    return {"items": results}
+
+@router.post("/comments", response_model=schemas.BatchCommentResults)
+async def batch_comments(batch: schemas.BatchComments, db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+    check_batch(current_user)
+    post_ids = await resolve_posts(db, [(item.username, item.puid) for item in batch.items])
+    new_comments = [
+        {"post_id": post_ids[(item.username, item.puid)], "user_id": current_user.id, "comment": item.comment}
+        for item in batch.items if (item.username, item.puid) in post_ids
+    ]
+    if new_comments:
+        insert_query = insert(models.PostCommentModel).returning(models.PostCommentModel, sort_by_parameter_order=True)
+        new_comments = (await db.scalars(insert_query, new_comments)).all()
+        commented_post_ids = {comment.post_id for comment in new_comments}
+        await db.execute(http_cache.bump_posts(commented_post_ids))
+        await tasks.refresh_posts.enqueue(db, post_ids=sorted(commented_post_ids))
+        await db.commit()
+    created = iter(new_comments)
+    results = []
+    for index, item in enumerate(batch.items):
+        if (item.username, item.puid) in post_ids:
+            results.append({"index": index, "status_code": status.HTTP_201_CREATED, "comment": next(created)})
+        else:
+            results.append(not_found(index, item))
+    for username in {username for username, _ in post_ids}:
+        response_cache.invalidate(username)
+    return {"items": results}
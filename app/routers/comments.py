@@ -1,100 +1,61 @@
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from .. import models, schemas, oauth2
-from ..database import get_db
+from .. import models, schemas, oauth2, pagination, http_cache, tasks
+from ..database import get_async_db
+from ..dependencies import get_post, get_read_post
+from ..replicas import get_read_db
+from ..response_cache import response_cache
+from ..responses import ModelJSONRoute
 
-router = APIRouter(prefix="/users/{username}/posts/{puid}/comments")
+router = APIRouter(prefix="/users/{username}/posts/{puid}/comments", route_class=ModelJSONRoute)
 
 # Comments API
 
-@router.get("/", response_model=List[schemas.GetComment])
-def read_comments(username: str, puid: int, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-    post_comments = db.query(models.PostCommentModel).filter(models.PostCommentModel.post_id == existing_post.id).all()
-    return post_comments
+@router.get("/", response_model=schemas.GetCommentPage)
+async def read_comments(request: Request, response: Response, limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, existing_post: models.PostModel = Depends(get_read_post), db: AsyncSession = Depends(get_read_db)):
+    # every comment change bumps the post, its version covers the whole list,
+    # the page parameters tell its pages apart
+    page = f"limit={limit}&cursor={cursor or ''}"
+    etag = http_cache.make_etag("c", existing_post.id, existing_post.version, existing_post.modified_at, page)
+    if http_cache.not_modified(request, etag, existing_post.modified_at):
+        return http_cache.not_modified_response(request, etag, existing_post.modified_at)
+    http_cache.set_cache_headers(request, response, etag, existing_post.modified_at)
+    post_comments_query = select(models.PostCommentModel).where(models.PostCommentModel.post_id == existing_post.id)
+    keys = [models.PostCommentModel.created_at, models.PostCommentModel.id]
+    return await pagination.paginate(db, post_comments_query, keys, limit=limit, cursor=cursor)
 
 @router.post("/", response_model=schemas.GetComment, status_code=status.HTTP_201_CREATED)
-def create_comments(username: str, puid: int, comment: schemas.CreateComment, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def create_comments(username: str, comment: schemas.CreateComment, existing_post: models.PostModel = Depends(get_post), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
     comment = comment.model_dump(exclude_none=True)
     comment["post_id"] = existing_post.id
     comment["user_id"] = current_user.id
     new_comment = models.PostCommentModel(**comment)
     db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
+    await db.execute(http_cache.bump_posts([existing_post.id]))
+    await tasks.refresh_posts.enqueue(db, post_ids=[existing_post.id])
+    await db.commit()
+    response_cache.invalidate(username)
     return new_comment
 
 @router.get("/{comment_id}", response_model=schemas.GetComment)
-def read_comments(username: str, puid: int, comment_id: int, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
+async def read_comments(comment_id: int, existing_post: models.PostModel = Depends(get_read_post), db: AsyncSession = Depends(get_read_db)):
+    post_comments_query = (
+        select(models.PostCommentModel)
+        .where(
+            (models.PostCommentModel.id == comment_id) &
+            (models.PostCommentModel.post_id == existing_post.id)
         )
     )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-    post_comments_query = db.query(models.PostCommentModel).filter(models.PostCommentModel.id == comment_id)
-    post_comments = post_comments_query.first()
-    if not post_comments_query:
+    post_comments = (await db.execute(post_comments_query)).scalars().first()
+    if not post_comments:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment id {comment_id} not found!"
@@ -102,36 +63,21 @@ def read_comments(username: str, puid: int, comment_id: int, db: Session = Depen
     return post_comments
 
 @router.put("/{comment_id}", response_model=schemas.GetComment)
-def update_comments(username: str, puid: int, comment_id: int, comment: schemas.UpdateComment, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def update_comments(username: str, comment_id: int, comment: schemas.UpdateComment, existing_post: models.PostModel = Depends(get_post), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
+    post_comments_query = (
+        select(models.PostCommentModel)
+        .where(
+            (models.PostCommentModel.id == comment_id) &
+            (models.PostCommentModel.post_id == existing_post.id)
         )
     )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-
-    post_comments_query = db.query(models.PostCommentModel).filter(models.PostCommentModel.id == comment_id)
-    post_comments = post_comments_query.first()
-    if not post_comments_query:
+    post_comments = (await db.execute(post_comments_query)).scalars().first()
+    if not post_comments:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment id {comment_id} not found!"
@@ -141,42 +87,29 @@ def update_comments(username: str, puid: int, comment_id: int, comment: schemas.
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    comment = comment.model_dump(exclude_none=True)
-    post_comments_query.update(comment, synchronize_session=False)
-    db.commit()
+    post_comments.comment = comment.comment
+    await db.execute(http_cache.bump_posts([existing_post.id]))
+    await tasks.refresh_posts.enqueue(db, post_ids=[existing_post.id])
+    await db.commit()
+    response_cache.invalidate(username)
     return post_comments
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comments(username: str, puid: int, comment_id: int, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def delete_comments(username: str, comment_id: int, existing_post: models.PostModel = Depends(get_post), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
+    post_comments_query = (
+        select(models.PostCommentModel)
+        .where(
+            (models.PostCommentModel.id == comment_id) &
+            (models.PostCommentModel.post_id == existing_post.id)
         )
     )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-
-    post_comments_query = db.query(models.PostCommentModel).filter(models.PostCommentModel.id == comment_id)
-    post_comments = post_comments_query.first()
-    if not post_comments_query:
+    post_comments = (await db.execute(post_comments_query)).scalars().first()
+    if not post_comments:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment id {comment_id} not found!"
@@ -186,7 +119,9 @@ def delete_comments(username: str, puid: int, comment_id: int, db: Session = Dep
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    db.delete(post_comments)
-    db.commit()
-    print(f"Comment Id {comment_id} deleted!")
+    await db.delete(post_comments)
+    await db.execute(http_cache.bump_posts([existing_post.id]))
+    await tasks.refresh_posts.enqueue(db, post_ids=[existing_post.id])
+    await db.commit()
+    response_cache.invalidate(username)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
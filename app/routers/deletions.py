@@ -0,0 +1,37 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from .. import models, schemas, oauth2
+from ..database import get_async_db
+from ..responses import ModelJSONRoute
+
+router = APIRouter(prefix="/deletions", route_class=ModelJSONRoute)
+
+# Deletions API
+# progress of the purge behind a 202 from DELETE /users/{username} or
+# DELETE /users/{username}/posts/{puid}, read from the primary so the
+# progress is never behind a replica. Only the user who asked for it or the
+# admin token may read it; the token of a deleted user still verifies, the
+# user row is not looked up.
+
+@router.get("/{deletion_id}", response_model=schemas.GetDeletion)
+async def read_deletion(deletion_id: int, db: AsyncSession = Depends(get_async_db), credentials: Optional[HTTPAuthorizationCredentials] = Depends(oauth2.admin_scheme)):
+    if credentials is None:
+        raise oauth2.return_credential_exception()
+    is_admin = oauth2.is_admin(credentials)
+    if not is_admin:
+        token_data = oauth2.verify_access_token(credentials.credentials, oauth2.return_credential_exception())
+    deletion = await db.get(models.DeletionModel, deletion_id)
+    if not deletion:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deletion id {deletion_id} not found!"
+        )
+    if not is_admin and deletion.owner_id != token_data.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not authorized!"
+        )
+    return deletion
@@ -0,0 +1,91 @@
+import orjson
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import Optional
+
+from .. import models, oauth2
+from ..replicas import read_sessionmaker
+
+router = APIRouter(prefix="/export", dependencies=[Depends(oauth2.require_admin)])
+
+# Export API
+# bulk exports for analytics jobs, every user's rows are in them so they
+# take settings.admin_token. One JSON object per line, streamed from a server
+# side cursor in batches of EXPORT_BATCH_SIZE rows, so memory stays flat
+# however large the export is.
+# Votes and comments have no modified_at of their own, every change to them
+# bumps their post's, so updated_since filters them through the post.
+# Deleted posts keep showing up with deleted_at set until their purge, so
+# incremental consumers see the delete.
+
+EXPORT_BATCH_SIZE = 1000
+
+def as_utc(value):
+    # stored timestamps are naive UTC
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def stream_rows(sessionmaker, statement):
+    async def lines():
+        async with sessionmaker() as db:
+            result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/posts.ndjson", response_class=StreamingResponse)
+async def export_posts(updated_since: Optional[datetime] = None, sessionmaker = Depends(read_sessionmaker)):
+    posts_query = (
+        select(
+            models.PostModel.id,
+            models.PostModel.puid,
+            models.PostModel.title,
+            models.PostModel.description,
+            models.PostModel.owner_id,
+            models.UserModel.username,
+            models.PostModel.version,
+            models.PostModel.modified_at,
+            models.PostModel.created_at,
+            models.PostModel.deleted_at,
+        )
+        .join(models.UserModel, models.UserModel.id == models.PostModel.owner_id)
+        .order_by(models.PostModel.id)
+    )
+    if updated_since:
+        posts_query = posts_query.where(models.PostModel.modified_at >= as_utc(updated_since))
+    return stream_rows(sessionmaker, posts_query)
+
+@router.get("/votes.ndjson", response_class=StreamingResponse)
+async def export_votes(updated_since: Optional[datetime] = None, sessionmaker = Depends(read_sessionmaker)):
+    votes_query = select(
+        models.PostVoteModel.id,
+        models.PostVoteModel.post_id,
+        models.PostVoteModel.user_id,
+        models.PostVoteModel.vote,
+        models.PostVoteModel.created_at,
+    ).order_by(models.PostVoteModel.id)
+    if updated_since:
+        votes_query = (
+            votes_query
+            .join(models.PostModel, models.PostModel.id == models.PostVoteModel.post_id)
+            .where(models.PostModel.modified_at >= as_utc(updated_since))
+        )
+    return stream_rows(sessionmaker, votes_query)
+
+@router.get("/comments.ndjson", response_class=StreamingResponse)
+async def export_comments(updated_since: Optional[datetime] = None, sessionmaker = Depends(read_sessionmaker)):
+    comments_query = select(
+        models.PostCommentModel.id,
+        models.PostCommentModel.post_id,
+        models.PostCommentModel.user_id,
+        models.PostCommentModel.comment,
+        models.PostCommentModel.created_at,
+    ).order_by(models.PostCommentModel.id)
+    if updated_since:
+        comments_query = (
+            comments_query
+            .join(models.PostModel, models.PostModel.id == models.PostCommentModel.post_id)
+            .where(models.PostModel.modified_at >= as_utc(updated_since))
+        )
+    return stream_rows(sessionmaker, comments_query)
@@ -0,0 +1,23 @@
+from fastapi import Depends, APIRouter, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Optional
+
+from .. import models, schemas, pagination, queries
+from ..replicas import get_read_db
+from ..responses import ModelJSONRoute
+
+router = APIRouter(prefix="/feed", route_class=ModelJSONRoute)
+
+# Feed API
+
+@router.get("/", response_model=schemas.GetPostPage)
+async def read_feed(limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    feed_query = select(models.PostFeedModel).options(
+        joinedload(models.PostFeedModel.post).options(*queries.post_options())
+    )
+    keys = [models.PostFeedModel.score, models.PostFeedModel.post_id]
+    page = await pagination.paginate(db, feed_query, keys, limit=limit, cursor=cursor, descending=True)
+    page["items"] = [row.post for row in page["items"]]
+    return page
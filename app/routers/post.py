@@ -1,50 +1,54 @@
 from datetime import datetime
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from .. import models, schemas, oauth2, utils
-from ..database import get_db
+from .. import models, schemas, oauth2, utils, pagination, queries, http_cache, feed, tasks
+from ..dependencies import get_post, get_post_for_response, resolve_post
+from ..database import get_async_db
+from ..replicas import get_read_db
+from ..response_cache import response_cache
+from ..responses import ModelJSONRoute
 
-router = APIRouter(prefix="/users/{username}/posts")
+router = APIRouter(prefix="/users/{username}/posts", route_class=ModelJSONRoute)
 
 # Posts API
 
-@router.get("/", response_model=List[schemas.GetPost])
-def read_posts(username: str, page: int = 10, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    posts = db.query(models.PostModel).filter(models.PostModel.owner_id == user.id).all()
-    return posts
+@router.get("/", response_model=schemas.GetPostPage)
+async def read_posts(username: str, request: Request, limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    async def render():
+        user_query = select(models.UserModel).where((models.UserModel.username == username) & models.UserModel.deleted_at.is_(None))
+        user = (await db.execute(user_query)).scalars().first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"username {username} not found!"
+            )
+        posts_query = (
+            select(models.PostModel)
+            .options(*queries.post_options())
+            .where((models.PostModel.owner_id == user.id) & models.PostModel.deleted_at.is_(None))
+        )
+        keys = [models.PostModel.created_at, models.PostModel.id]
+        page = await pagination.paginate(db, posts_query, keys, limit=limit, cursor=cursor, descending=True)
+        return response_cache.entry(schemas.GetPostPage.model_validate(page))
+
+    cache_key = response_cache.key(username, request)
+    entry = await response_cache.get_or_render(cache_key, render)
+    return response_cache.respond(request, entry)
 
 @router.post("/", response_model=schemas.GetPost, status_code=status.HTTP_201_CREATED)
-def create_post(username: str, post: schemas.CreatePost, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
-    if username != current_user.username:
+async def create_post(username: str, post: schemas.CreatePost, db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+    if (not current_user) or (username != current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
     puid = utils.get_random_number()
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    new_post = post_query.first()
+    # puid is unique across all posts, the owner is the authenticated user
+    post_query = select(models.PostModel.id).where(models.PostModel.puid == puid)
+    new_post = (await db.execute(post_query)).scalars().first()
     if new_post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -53,99 +57,68 @@ def create_post(username: str, post: schemas.CreatePost, db: Session = Depends(g
     post = post.model_dump(exclude_none=True)
     post["puid"] = puid
     post["owner_id"] = current_user.id
-    new_post = models.PostModel(**post)
+    new_post = models.PostModel(**post, post_comments=[])
+    new_post.score = models.PostVoteStatsModel()
+    new_post.feed = feed.new_feed()
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    await db.commit()
+    # relationships cannot lazy load on an AsyncSession, score and comments
+    # are already in memory, only the owner needs loading
+    await db.refresh(new_post, attribute_names=["owner"])
+    response_cache.invalidate(username)
     return new_post
 
 @router.get("/{puid}", response_model=schemas.GetPost)
-def read_post(username: str, puid: int, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    post = post_query.first()
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-    return post
+async def read_post(username: str, puid: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    async def render():
+        post = await resolve_post(db, username, puid, options=queries.post_options())
+        etag = http_cache.make_etag("p", post.id, post.version, post.modified_at)
+        return response_cache.entry(schemas.GetPost.model_validate(post), etag, post.modified_at)
+
+    cache_key = response_cache.key(username, request)
+    entry = response_cache.get(cache_key)
+    if entry is None and http_cache.is_conditional(request):
+        post = await resolve_post(db, username, puid, options=queries.post_version_options())
+        etag = http_cache.make_etag("p", post.id, post.version, post.modified_at)
+        if http_cache.not_modified(request, etag, post.modified_at):
+            return http_cache.not_modified_response(request, etag, post.modified_at)
+    if entry is None:
+        entry = await response_cache.get_or_render(cache_key, render)
+    return response_cache.respond(request, entry)
 
 @router.put("/{puid}", response_model=schemas.GetPost)
-def update_post(username: str, puid: int, post: schemas.UpdatePost, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def update_post(username: str, post: schemas.UpdatePost, existing_post: models.PostModel = Depends(get_post_for_response), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if (not current_user) or (username != current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
     updated_post = post.model_dump(exclude_none=True)
     updated_post["modified_at"] = datetime.utcnow()
-    post_query.update(updated_post, synchronize_session=False)
-    db.commit()
+    update_query = (
+        update(models.PostModel)
+        .where(models.PostModel.id == existing_post.id)
+        .values(version=models.PostModel.version + 1, **updated_post)
+        .returning(models.PostModel.version)
+        .execution_options(synchronize_session=False)
+    )
+    updated_post["version"] = (await db.execute(update_query)).scalar_one()
+    await db.commit()
+    response_cache.invalidate(username)
+    for key, value in updated_post.items():
+        setattr(existing_post, key, value)
     return existing_post
 
-@router.delete("/{puid}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(username: str, puid: int, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+@router.delete("/{puid}", response_model=schemas.GetDeletion, status_code=status.HTTP_202_ACCEPTED)
+async def delete_post(username: str, puid: int, request: Request, response: Response, existing_post: models.PostModel = Depends(get_post), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if (not current_user) or (username != current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-    # post_query.delete(synchronize_session=False)
-    # db.commit()
-    db.delete(existing_post)
-    db.commit()
-    print(f"Post Id {puid} deleted!")
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    # tombstone now, votes and comments are purged by a job
+    deletion = await tasks.delete_later(db, "post", existing_post.id, current_user.id)
+    await db.commit()
+    response_cache.invalidate(username)
+    response.headers["Location"] = str(request.url_for("read_deletion", deletion_id=deletion.id))
+    return deletion
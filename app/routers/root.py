@@ -1,7 +1,50 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from .. import oauth2
+from ..admission import load_metrics
+from ..config import settings
+from ..database import engine, async_engine, pool_metrics
+from ..metrics import cache_stats, route_metrics
+from ..slow_queries import slow_query_log
 
 router = APIRouter()
 
 @router.get("/")
 def read_root():
     return {"Hello": "World"}
+
+# /status/* and /metrics show SQL text, query plans and internals, they take
+# settings.admin_token like the exports
+
+@router.get("/status/pool", dependencies=[Depends(oauth2.require_admin)])
+def read_pool_status():
+    return {
+        "checkout": pool_metrics.snapshot(),
+        "async_pool": async_engine.pool.status(),
+        "sync_pool": engine.pool.status(),
+    }
+
+@router.get("/status/caches", dependencies=[Depends(oauth2.require_admin)])
+def read_cache_status():
+    return cache_stats()
+
+@router.get("/status/load", dependencies=[Depends(oauth2.require_admin)])
+def read_load_status():
+    return {
+        **load_metrics.snapshot(),
+        "pool_waiting": pool_metrics.waiting,
+        "max_in_flight": settings.admission_max_in_flight,
+        "max_pool_waiters": settings.admission_max_pool_waiters,
+    }
+
+@router.get("/status/slow-queries", dependencies=[Depends(oauth2.require_admin)])
+def read_slow_queries():
+    return {
+        "threshold_ms": settings.slow_query_ms,
+        "statements": slow_query_log.worst(),
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(oauth2.require_admin)])
+def read_metrics():
+    return PlainTextResponse(route_metrics.exposition(), media_type="text/plain; version=0.0.4")
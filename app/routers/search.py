@@ -0,0 +1,30 @@
+from fastapi import Depends, APIRouter, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import with_expression
+from typing import Optional
+
+from .. import models, schemas, pagination, queries, search
+from ..replicas import get_read_db
+from ..responses import ModelJSONRoute
+
+router = APIRouter(prefix="/search", route_class=ModelJSONRoute)
+
+# Search API
+# posts matching `q` in their title, description or comments, most relevant
+# first. Pages are keyed on (search_rank, post id) like every other listing.
+
+@router.get("/", response_model=schemas.GetPostPage)
+async def search_posts(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    ranked = search.ranked_posts(db.bind.dialect.name, q)
+    if ranked is None:
+        return {"items": [], "next_cursor": None, "prev_cursor": None, "limit": limit}
+    ranked = ranked.subquery()
+    search_query = (
+        select(models.PostModel)
+        .join(ranked, ranked.c.post_id == models.PostModel.id)
+        .where(models.PostModel.deleted_at.is_(None))
+        .options(*queries.post_options(), with_expression(models.PostModel.search_rank, ranked.c.search_rank))
+    )
+    keys = [ranked.c.search_rank, models.PostModel.id]
+    return await pagination.paginate(db, search_query, keys, limit=limit, cursor=cursor, descending=True)
@@ -1,64 +1,74 @@
 from datetime import datetime
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from .. import models, schemas, utils, oauth2
-from ..database import get_db
+from .. import models, schemas, oauth2, pagination, http_cache, tasks
+from ..hashing import password_hasher
+from ..database import get_async_db
+from ..replicas import get_read_db
+from ..response_cache import response_cache
+from ..responses import ModelJSONRoute
 
-router = APIRouter(prefix="/users")
+router = APIRouter(prefix="/users", route_class=ModelJSONRoute)
 
 # Users API
 
-@router.get("/", response_model=List[schemas.GetUser])
-def read_users(page: int = 10, db: Session = Depends(get_db)):
-    users = db.query(models.UserModel).all()
-    return users
+@router.get("/", response_model=schemas.GetUserPage)
+async def read_users(limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    users_query = select(models.UserModel).where(models.UserModel.deleted_at.is_(None))
+    keys = [models.UserModel.created_at, models.UserModel.id]
+    return await pagination.paginate(db, users_query, keys, limit=limit, cursor=cursor)
 
 @router.post("/", response_model=schemas.GetUser, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.CreateUser, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.email == user.email)
-    new_user = user_query.first()
+async def create_user(user: schemas.CreateUser, db: AsyncSession = Depends(get_async_db)):
+    user_query = select(models.UserModel).where(models.UserModel.email == user.email)
+    new_user = (await db.execute(user_query)).scalars().first()
     if new_user:
         raise HTTPException(
             status_code=status.HTTP_226_IM_USED,
             detail=f"email {user.email} already exists!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == user.username)
-    new_user = user_query.first()
+    user_query = select(models.UserModel).where(models.UserModel.username == user.username)
+    new_user = (await db.execute(user_query)).scalars().first()
     if new_user:
         raise HTTPException(
             status_code=status.HTTP_226_IM_USED,
             detail=f"username {user.username} already exists!"
         )
     new_user = user.model_dump(exclude_none=True)
-    new_user["hashed_password"] = utils.hash_password(password=new_user["hashed_password"])
+    new_user["hashed_password"] = await password_hasher.hash_password(new_user["hashed_password"])
     new_user = models.UserModel(**new_user)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 @router.get("/{username}", response_model=schemas.GetUser)
-def read_user(username: str, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
+async def read_user(username: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    user_query = select(models.UserModel).where((models.UserModel.username == username) & models.UserModel.deleted_at.is_(None))
+    user = (await db.execute(user_query)).scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"username {username} not found!"
         )
+    etag = http_cache.make_etag("u", user.id, user.version, user.modified_at)
+    if http_cache.not_modified(request, etag, user.modified_at):
+        return http_cache.not_modified_response(request, etag, user.modified_at)
+    http_cache.set_cache_headers(request, response, etag, user.modified_at)
     return user
 
 @router.put("/{username}", response_model=schemas.GetUser)
-def update_user(username: str, user: schemas.UpdateUser, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def update_user(username: str, user: schemas.UpdateUser, db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if (not current_user) or (username != current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    existing_user = user_query.first()
+    user_query = select(models.UserModel).where((models.UserModel.username == username) & models.UserModel.deleted_at.is_(None))
+    existing_user = (await db.execute(user_query)).scalars().first()
     if not existing_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -66,27 +76,33 @@ def update_user(username: str, user: schemas.UpdateUser, db: Session = Depends(g
         )
     updated_user = user.model_dump(exclude_none=True)
     updated_user["modified_at"] = datetime.utcnow()
-    user_query.update(updated_user, synchronize_session=False)
-    db.commit()
+    update_query = (
+        update(models.UserModel)
+        .where(models.UserModel.id == existing_user.id)
+        .values(version=models.UserModel.version + 1, **updated_user)
+        .returning(models.UserModel.version)
+        .execution_options(synchronize_session=False)
+    )
+    updated_user["version"] = (await db.execute(update_query)).scalar_one()
+    await db.commit()
+    oauth2.invalidate_user(existing_user.id)
+    for key, value in updated_user.items():
+        setattr(existing_user, key, value)
     return existing_user
 
-@router.delete("/{username}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(username: str, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+@router.delete("/{username}", response_model=schemas.GetDeletion, status_code=status.HTTP_202_ACCEPTED)
+async def delete_user(username: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if (not current_user) or (username != current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.id == current_user.id)
-    existing_user = user_query.first()
-    if not existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    # user_query.delete(synchronize_session=False)
-    # db.commit()
-    db.delete(existing_user)
-    db.commit()
-    print(f"user {username} deleted!")
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    # tombstone now, the user's posts, votes and comments are purged by a job
+    deletion = await tasks.delete_later(db, "user", current_user.id, current_user.id)
+    await db.commit()
+    # their posts, votes and comments showed up under other owners' pages
+    # too, the purge recounts and clears again as it goes
+    response_cache.clear()
+    oauth2.invalidate_user(current_user.id)
+    response.headers["Location"] = str(request.url_for("read_deletion", deletion_id=deletion.id))
+    return deletion
@@ -1,89 +1,40 @@
-from fastapi import status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from .. import models, schemas, oauth2
-from ..database import get_db
+from .. import models, schemas, oauth2, pagination, vote_stats, http_cache, tasks
+from ..database import get_async_db
+from ..dependencies import get_post, get_read_post
+from ..replicas import get_read_db
+from ..response_cache import response_cache
+from ..responses import ModelJSONRoute
 
-router = APIRouter(prefix="/users/{username}/posts/{puid}/votes")
+router = APIRouter(prefix="/users/{username}/posts/{puid}/votes", route_class=ModelJSONRoute)
 
 # Votes API
 
-@router.get("/", response_model=List[schemas.GetVote])
-def read_votes(username: str, puid: int, db: Session = Depends(get_db)):
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-    post_votes = db.query(models.PostVoteModel).filter(models.PostVoteModel.post_id == existing_post.id).all()
-    return post_votes
+@router.get("/", response_model=schemas.GetVotePage)
+async def read_votes(limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT), cursor: Optional[str] = None, existing_post: models.PostModel = Depends(get_read_post), db: AsyncSession = Depends(get_read_db)):
+    post_votes_query = select(models.PostVoteModel).where(models.PostVoteModel.post_id == existing_post.id)
+    keys = [models.PostVoteModel.created_at, models.PostVoteModel.id]
+    return await pagination.paginate(db, post_votes_query, keys, limit=limit, cursor=cursor)
 
 @router.put("/", response_model=schemas.GetVote)
-def update_votes(username: str, puid: int, vote: schemas.UpdateVote, db: Session = Depends(get_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
+async def update_votes(username: str, vote: schemas.UpdateVote, existing_post: models.PostModel = Depends(get_post), db: AsyncSession = Depends(get_async_db), current_user: schemas.GetUser = Depends(oauth2.get_current_user)):
     if (not current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not authorized!"
         )
-    user_query = db.query(models.UserModel).filter(models.UserModel.username == username)
-    user = user_query.first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"username {username} not found!"
-        )
-    post_query = (
-        db.query(models.PostModel)
-        .filter(
-            (models.PostModel.owner_id == user.id) & 
-            (models.PostModel.puid == puid)
-        )
-    )
-    existing_post = post_query.first()
-    if not existing_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post id {puid} not found!"
-        )
-
-    vote_query = (
-        db.query(models.PostVoteModel)
-        .filter(
-            (models.PostVoteModel.post_id == existing_post.id) & 
-            (models.PostVoteModel.user_id == current_user.id)
-        )
-    )
-    post_vote = vote_query.first()
-    if not post_vote:
-        print("new vote")
-        vote = vote.model_dump(exclude_none=True)
-        vote["user_id"] = current_user.id
-        vote["post_id"] = existing_post.id
-        post_vote = models.PostVoteModel(**vote)
-        db.add(post_vote)
-        db.commit()
-        db.refresh(post_vote)
-    elif post_vote.vote == vote.vote:
-        print("same vote")
-    else:
-        print("update vote")
-        vote = vote.model_dump(exclude_none=True)
-        vote_query.update(vote, synchronize_session=False)
-        db.commit()
+    # counters first: they need the previous vote the upsert is about to replace
+    await db.execute(vote_stats.lock_stats([existing_post.id]))
+    old_votes = dict((await db.execute(vote_stats.previous_votes([existing_post.id], current_user.id))).all())
+    await db.execute(vote_stats.record_vote(existing_post.id, old_votes.get(existing_post.id), vote.vote))
+    upsert_query = vote_stats.upsert_vote(db.bind.dialect.name, existing_post.id, current_user.id, vote.vote)
+    post_vote = (await db.execute(upsert_query)).scalars().one()
+    await db.execute(http_cache.bump_posts([existing_post.id]))
+    await tasks.refresh_posts.enqueue(db, post_ids=[existing_post.id])
+    await db.commit()
+    response_cache.invalidate(username)
     return post_vote
@@ -3,6 +3,8 @@ from datetime import datetime
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import Optional, Literal, List
 
+from .config import settings
+
 # User Schemas
 
 class CreateUser(BaseModel):
@@ -39,6 +41,12 @@ class GetEmail(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class GetUserPage(BaseModel):
+    items: List[GetUser]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 # Vote Schemas
 
 class GetVote(BaseModel):
@@ -48,9 +56,23 @@ class GetVote(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class GetVotePage(BaseModel):
+    items: List[GetVote]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class UpdateVote(BaseModel):
     vote: Literal[0, 1, 2, 3, 4, 5]
 
+class GetScore(BaseModel):
+    vote_count: int
+    vote_sum: int
+    average: float
+    histogram: List[int] = Field(description="number of votes per value, index 0 to 5")
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Comment Schemas
 
 class CreateComment(BaseModel):
@@ -62,6 +84,12 @@ class GetComment(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class GetCommentPage(BaseModel):
+    items: List[GetComment]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class UpdateComment(BaseModel):
     comment: str
 
@@ -79,15 +107,68 @@ class GetPost(BaseModel):
     modified_at: datetime
     created_at: datetime
     owner: GetUsername
-    post_votes: Optional[List[GetVote]]
+    score: Optional[GetScore]
     post_comments: Optional[List[GetComment]]
 
     model_config = ConfigDict(from_attributes=True)
 
+class GetPostPage(BaseModel):
+    items: List[GetPost]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class UpdatePost(BaseModel):
     title: Optional[str] = Field(None, description="update post title")
     description: Optional[str] = Field(None, description="update post description")
 
+# Batch Schemas
+
+class BatchVote(UpdateVote):
+    username: str
+    puid: int
+
+class BatchVotes(BaseModel):
+    items: List[BatchVote] = Field(max_length=settings.batch_max_items)
+
+class BatchVoteResult(BaseModel):
+    index: int
+    status_code: int
+    detail: Optional[str] = None
+    vote: Optional[GetVote] = None
+
+class BatchVoteResults(BaseModel):
+    items: List[BatchVoteResult]
+
+class BatchComment(CreateComment):
+    username: str
+    puid: int
+
+class BatchComments(BaseModel):
+    items: List[BatchComment] = Field(max_length=settings.batch_max_items)
+
+class BatchCommentResult(BaseModel):
+    index: int
+    status_code: int
+    detail: Optional[str] = None
+    comment: Optional[GetComment] = None
+
+class BatchCommentResults(BaseModel):
+    items: List[BatchCommentResult]
+
+# Deletion Schemas
+
+class GetDeletion(BaseModel):
+    id: int
+    kind: str
+    target_id: int
+    status: str
+    rows_deleted: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Login Schemas
 
 class UserLogin(BaseModel):
@@ -0,0 +1,146 @@
+import re
+from sqlalchemy import DDL, Float, bindparam, column, event, func, literal_column, select, table, text, type_coerce
+
+from . import models
+
+# Full-text search
+# post_search indexes every post's title, description and comments. Triggers
+# on posts keep titles and descriptions in sync for every write path. The
+# comments of a post are reindexed by the refresh_posts job with
+# refresh_statement, so a comment write never re-reads the whole thread
+# inside its request. SQLite uses an FTS5 virtual table ranked with bm25,
+# PostgreSQL a tsvector table under a GIN index ranked with ts_rank. Title
+# matches weigh more than description matches, which weigh more than
+# comment matches.
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5(title, description, comments, tokenize='porter unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS post_search_posts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO post_search (rowid, title, description, comments) VALUES (new.id, new.title, coalesce(new.description, ''), '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_search_posts_update AFTER UPDATE OF title, description ON posts BEGIN
+        UPDATE post_search SET title = new.title, description = coalesce(new.description, '') WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_search_posts_delete AFTER DELETE ON posts BEGIN
+        DELETE FROM post_search WHERE rowid = old.id;
+    END""",
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM post_search",
+    """INSERT INTO post_search (rowid, title, description, comments)
+    SELECT posts.id, posts.title, coalesce(posts.description, ''), coalesce(
+        (SELECT group_concat(comment, ' ') FROM post_comments WHERE post_comments.post_id = posts.id), ''
+    ) FROM posts""",
+]
+
+POSTGRESQL_DOCUMENT = """
+    setweight(to_tsvector('english', posts.title), 'A') ||
+    setweight(to_tsvector('english', coalesce(posts.description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(comment, ' ') FROM post_comments WHERE post_comments.post_id = posts.id), ''
+    )), 'C')
+"""
+
+POSTGRESQL_INSTALL = [
+    """CREATE TABLE IF NOT EXISTS post_search (
+        post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)",
+    f"""CREATE OR REPLACE FUNCTION post_search_refresh(target INTEGER) RETURNS VOID AS $$
+        INSERT INTO post_search (post_id, document)
+        SELECT posts.id, {POSTGRESQL_DOCUMENT} FROM posts WHERE posts.id = target
+        ON CONFLICT (post_id) DO UPDATE SET document = excluded.document;
+    $$ LANGUAGE SQL""",
+    """CREATE OR REPLACE FUNCTION post_search_posts_trigger() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM post_search_refresh(NEW.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    # CREATE TRIGGER has no IF NOT EXISTS, and OR REPLACE needs PostgreSQL 14
+    """DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'post_search_posts') THEN
+            CREATE TRIGGER post_search_posts AFTER INSERT OR UPDATE OF title, description ON posts
+                FOR EACH ROW EXECUTE FUNCTION post_search_posts_trigger();
+        END IF;
+    END $$""",
+]
+
+POSTGRESQL_REBUILD = [
+    "DELETE FROM post_search",
+    f"INSERT INTO post_search (post_id, document) SELECT posts.id, {POSTGRESQL_DOCUMENT} FROM posts",
+]
+
+DIALECTS = {
+    "sqlite": (SQLITE_INSTALL, SQLITE_REBUILD),
+    "postgresql": (POSTGRESQL_INSTALL, POSTGRESQL_REBUILD),
+}
+
+def _statements(dialect_name, index):
+    if dialect_name not in DIALECTS:
+        raise ValueError(f"full-text search is not supported on {dialect_name}!")
+    return [text(statement) for statement in DIALECTS[dialect_name][index]]
+
+def install_statements(dialect_name):
+    return _statements(dialect_name, 0)
+
+def rebuild_statements(dialect_name):
+    """DELETE + INSERT ... SELECT reindexing every post."""
+    return _statements(dialect_name, 1)
+
+def refresh_statement(dialect_name, post_ids):
+    """Statement reindexing the comments of the posts in `post_ids`."""
+    if dialect_name == "sqlite":
+        statement = text(
+            "UPDATE post_search SET comments = coalesce("
+            "(SELECT group_concat(comment, ' ') FROM post_comments WHERE post_comments.post_id = post_search.rowid), ''"
+            ") WHERE rowid IN :post_ids"
+        )
+    elif dialect_name == "postgresql":
+        statement = text("SELECT post_search_refresh(posts.id) FROM posts WHERE posts.id IN :post_ids")
+    else:
+        raise ValueError(f"full-text search is not supported on {dialect_name}!")
+    return statement.bindparams(bindparam("post_ids", value=list(post_ids), expanding=True))
+
+# metadata.create_all() (fresh databases, scripts) installs the index too and
+# like create_all the DDL skips what already exists. Migrated databases get
+# it from alembic.
+for dialect_name, (install, _) in DIALECTS.items():
+    for statement in install:
+        event.listen(models.Base.metadata, "after_create", DDL(statement.replace("%", "%%")).execute_if(dialect=dialect_name))
+
+def fts5_query(query):
+    """User input as an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+def ranked_posts(dialect_name, query):
+    """SELECT post_id, search_rank of the posts matching `query`, higher is more relevant."""
+    if dialect_name == "sqlite":
+        match = fts5_query(query)
+        if match is None:
+            return None
+        post_search = table("post_search", column("rowid"))
+        return (
+            select(
+                post_search.c.rowid.label("post_id"),
+                # bm25 is lower for better matches, weights per column
+                type_coerce(-func.bm25(literal_column("post_search"), 10.0, 5.0, 1.0), Float).label("search_rank"),
+            )
+            .select_from(post_search)
+            .where(literal_column("post_search").op("MATCH")(match))
+        )
+    if dialect_name == "postgresql":
+        post_search = table("post_search", column("post_id"), column("document"))
+        tsquery = func.websearch_to_tsquery("english", query)
+        return (
+            select(
+                post_search.c.post_id,
+                type_coerce(func.ts_rank(post_search.c.document, tsquery), Float).label("search_rank"),
+            )
+            .where(post_search.c.document.op("@@")(tsquery))
+        )
+    raise ValueError(f"full-text search is not supported on {dialect_name}!")
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Slow query log
+# statements slower than settings.slow_query_ms are logged with the shape of
+# their parameters (types, never values), the route that ran them and the
+# database's plan for them, explained the first time the statement is slow
+# only. The slow_query_top_n worst statements are kept in memory for
+# GET /status/slow-queries.
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+def parameter_shape(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+def explain(conn, statement, parameters):
+    """Plan of `statement` as text rows, read on a separate DBAPI cursor of the same connection."""
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    # a failing statement aborts the whole transaction on postgresql
+    savepoint = conn.dialect.name == "postgresql"
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as exc:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return [f"EXPLAIN failed: {exc}"]
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+class SlowQueryLog:
+    def __init__(self, top_n=50):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+
+    def observe(self, conn, statement, parameters, executemany, seconds, route=None):
+        shape = parameter_shape(parameters[0] if executemany and parameters else parameters)
+        with self._lock:
+            plan = self.statements.get(statement, {}).get("plan")
+        # one EXPLAIN per statement, a request that is slow already gets no extra round trips
+        if plan is None and settings.slow_query_explain and not executemany:
+            plan = explain(conn, statement, parameters)
+        logger.warning(
+            "slow query %.1fms route=%s parameters=%s\n%s\nplan:\n%s",
+            seconds * 1000, route, shape, statement, "\n".join(plan or []),
+        )
+        with self._lock:
+            entry = self.statements.get(statement)
+            if entry is None:
+                entry = self.statements[statement] = {
+                    "statement": statement,
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["last_seen"] = time.time()
+            entry["route"] = route
+            entry["parameters"] = shape
+            if seconds >= entry["max_seconds"]:
+                entry["max_seconds"] = seconds
+                entry["plan"] = plan
+            if len(self.statements) > self.top_n:
+                fastest = min(self.statements.values(), key=lambda item: item["max_seconds"])
+                del self.statements[fastest["statement"]]
+
+    def worst(self):
+        with self._lock:
+            return sorted(
+                (dict(entry) for entry in self.statements.values()),
+                key=lambda entry: entry["max_seconds"],
+                reverse=True,
+            )
+
+slow_query_log = SlowQueryLog(top_n=settings.slow_query_top_n)
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from . import models, feed, search, vote_stats, http_cache, tombstones
+from .config import settings
+from .jobs import job_queue
+from .response_cache import response_cache
+
+# Jobs
+# follow-up work of request writes, run by the job worker (see app.jobs).
+# Each one recomputes from the source rows, running it twice is harmless.
+
+@job_queue.job("refresh_posts")
+async def refresh_posts(db, post_ids):
+    """Feed counters and indexed comments of posts whose votes or comments changed."""
+    await db.execute(feed.refresh_statement(post_ids))
+    await db.execute(search.refresh_statement(db.bind.dialect.name, post_ids))
+
+@job_queue.job("recount_posts")
+async def recount_posts(db, post_ids):
+    """Everything derived from the votes and comments of posts that lost rows in bulk."""
+    for statement in vote_stats.rebuild_statements(post_ids):
+        await db.execute(statement)
+    await db.execute(feed.refresh_statement(post_ids))
+    await db.execute(search.refresh_statement(db.bind.dialect.name, post_ids))
+    await db.execute(http_cache.bump_posts(post_ids))
+    # pages rendered before the commit carry the old counters, in the web
+    # processes too when this runs in python -m app.cli worker
+    generation = await response_cache.invalidate_shared(db)
+    await db.commit()
+    response_cache.shared_generation = generation
+
+@job_queue.job("purge")
+async def purge(db, deletion_id):
+    """Delete the rows under a tombstone chunk by chunk, see app.tombstones."""
+    deletion = await db.get(models.DeletionModel, deletion_id)
+    if deletion is None or deletion.status == "done":
+        return
+    deletion.status = "running"
+    await job_queue.renew(db)
+    await db.commit()
+    for model, condition, recount in tombstones.purge_steps(deletion.kind, deletion.target_id):
+        while True:
+            rows = (await db.execute(tombstones.chunk_statement(model, condition, recount))).scalars().all()
+            if recount and rows:
+                await recount_posts.enqueue(db, post_ids=sorted(set(rows)))
+            deletion.rows_deleted += len(rows)
+            # a chunk only commits while this run still holds the job
+            await job_queue.renew(db)
+            await db.commit()
+            if len(rows) < settings.purge_batch_size:
+                break
+    deletion.status = "done"
+    deletion.finished_at = datetime.utcnow()
+    await job_queue.renew(db)
+    await db.commit()
+
+async def delete_later(db, kind, target_id, owner_id):
+    """Tombstone a user or post and enqueue its purge, in the caller's transaction."""
+    for statement in tombstones.tombstone_statements(kind, target_id, datetime.utcnow()):
+        await db.execute(statement.execution_options(synchronize_session=False))
+    deletion = models.DeletionModel(kind=kind, target_id=target_id, owner_id=owner_id)
+    db.add(deletion)
+    await db.flush()
+    await purge.enqueue(db, deletion_id=deletion.id)
+    return deletion
@@ -0,0 +1,67 @@
+from sqlalchemy import delete, select, update
+
+from . import models
+from .config import settings
+
+# Tombstones
+# DELETE on a user or a post only sets deleted_at, drops its feed rows and
+# answers 202 with a deletions row to poll. Reads skip tombstoned rows from
+# then on. The purge job deletes what is underneath in chunks of
+# purge_batch_size rows, one transaction per chunk and children first, so
+# no statement or transaction grows with the size of the user.
+# post_vote_stats, post_feed and the search index follow their post through
+# ON DELETE CASCADE and triggers.
+
+def tombstone_statements(kind, target_id, now):
+    post, feed = models.PostModel, models.PostFeedModel
+    if kind == "user":
+        user = models.UserModel
+        own_posts = select(post.id).where(post.owner_id == target_id)
+        return [
+            update(user)
+            .where(user.id == target_id)
+            .values(deleted_at=now, version=user.version + 1, modified_at=now),
+            update(post)
+            .where((post.owner_id == target_id) & post.deleted_at.is_(None))
+            .values(deleted_at=now, version=post.version + 1, modified_at=now),
+            delete(feed).where(feed.post_id.in_(own_posts)),
+        ]
+    if kind == "post":
+        return [
+            update(post)
+            .where(post.id == target_id)
+            .values(deleted_at=now, version=post.version + 1, modified_at=now),
+            delete(feed).where(feed.post_id == target_id),
+        ]
+    raise ValueError(f"unknown deletion kind {kind}!")
+
+def purge_steps(kind, target_id):
+    """(model, condition, recount) in purge order, recount marks rows under other users' posts."""
+    post, vote, comment = models.PostModel, models.PostVoteModel, models.PostCommentModel
+    if kind == "user":
+        own_posts = select(post.id).where(post.owner_id == target_id)
+        return [
+            (vote, vote.user_id == target_id, True),
+            (comment, comment.user_id == target_id, True),
+            (vote, vote.post_id.in_(own_posts), False),
+            (comment, comment.post_id.in_(own_posts), False),
+            (post, post.owner_id == target_id, False),
+            (models.UserModel, models.UserModel.id == target_id, False),
+        ]
+    if kind == "post":
+        return [
+            (vote, vote.post_id == target_id, False),
+            (comment, comment.post_id == target_id, False),
+            (post, post.id == target_id, False),
+        ]
+    raise ValueError(f"unknown deletion kind {kind}!")
+
+def chunk_statement(model, condition, recount=False):
+    """DELETE of the next purge_batch_size rows matching `condition`, returning their post_id or id."""
+    chunk = select(model.id).where(condition).limit(settings.purge_batch_size).scalar_subquery()
+    return (
+        delete(model)
+        .where(model.id.in_(chunk))
+        .returning(model.post_id if recount else model.id)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,11 +1,20 @@
-from passlib.hash import sha256_crypt
+from passlib.context import CryptContext
 from random import randrange
 
+from .config import settings
+
+# the first scheme hashes new passwords, the others are only verified and
+# get rehashed on the next successful login
+pwd_context = CryptContext(schemes=settings.password_schemes.split(","), deprecated="auto")
+
 def hash_password(password):
-    return sha256_crypt.hash(str(password))
+    return pwd_context.hash(str(password))
 
 def verify_password(password, hashed_password):
-    return sha256_crypt.verify(password, hashed_password)
+    return pwd_context.verify(password, hashed_password)
+
+def verify_and_update_password(password, hashed_password):
+    return pwd_context.verify_and_update(password, hashed_password)
 
 def get_random_number():
     return randrange(1000001, 10000000)
@@ -0,0 +1,123 @@
+from sqlalchemy import Integer, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import models
+
+# Vote stats
+# per post counters kept next to the votes so rendering a post never has to
+# read its vote rows. Functions return statements so the async routers and
+# the sync CLI can both execute them.
+
+VOTE_VALUES = range(6)
+
+def histogram_column(value):
+    return getattr(models.PostVoteStatsModel, f"votes_{value}")
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def upsert_vote(dialect_name, post_id, user_id, vote):
+    """INSERT ... ON CONFLICT DO UPDATE ... RETURNING the user's vote on a post."""
+    return upsert_votes(dialect_name, [{"post_id": post_id, "user_id": user_id, "vote": vote}])
+
+def upsert_votes(dialect_name, rows):
+    """Multi-row `upsert_vote`, at most one row per (post_id, user_id)."""
+    if dialect_name not in UPSERT_DIALECTS:
+        raise ValueError(f"vote upsert is not supported on {dialect_name}!")
+    statement = UPSERT_DIALECTS[dialect_name](models.PostVoteModel).values(rows)
+    return (
+        statement
+        .on_conflict_do_update(
+            index_elements=[models.PostVoteModel.post_id, models.PostVoteModel.user_id],
+            set_={"vote": statement.excluded.vote},
+        )
+        .returning(models.PostVoteModel)
+        .execution_options(populate_existing=True)
+    )
+
+def lock_stats(post_ids):
+    """SELECT ... FOR UPDATE of the posts' counters, in post_id order.
+
+    Run it first in every vote transaction. Concurrent votes on a post then
+    take turns, and `previous_votes` after the lock sees the votes committed
+    meanwhile. Without it, two submissions of the same user could both read
+    no previous vote and both count as a first vote.
+    """
+    stats = models.PostVoteStatsModel
+    return (
+        select(stats.post_id)
+        .where(stats.post_id.in_(post_ids))
+        .order_by(stats.post_id)
+        .with_for_update()
+    )
+
+def previous_votes(post_ids, user_id):
+    """SELECT post_id, vote of the user's current votes on the posts, run after `lock_stats`."""
+    vote = models.PostVoteModel
+    return select(vote.post_id, vote.vote).where(vote.post_id.in_(post_ids) & (vote.user_id == user_id))
+
+def vote_deltas(post_id, old_vote, new_vote):
+    """`record_votes` parameters applying one vote, `old_vote` is None for a first vote."""
+    deltas = {
+        "vote_post_id": post_id,
+        "count_delta": int(old_vote is None),
+        "sum_delta": new_vote - (old_vote or 0),
+    }
+    for value in VOTE_VALUES:
+        deltas[f"votes_{value}_delta"] = int(value == new_vote) - int(value == old_vote)
+    return deltas
+
+def record_votes():
+    """UPDATE adding `vote_deltas` to a post's counters, for executemany.
+
+    The previous vote comes in as bound deltas, read once by `previous_votes`,
+    so the UPDATE holding the counters lock touches no other table.
+    """
+    # bind names must not clash with the updated table's column names
+    return _record_statement({name: bindparam(name, type_=Integer) for name in vote_deltas(0, None, 0)})
+
+def record_vote(post_id, old_vote, new_vote):
+    """`record_votes` for a single vote."""
+    return _record_statement(vote_deltas(post_id, old_vote, new_vote))
+
+def _record_statement(deltas):
+    stats = models.PostVoteStatsModel.__table__.c
+    values = {
+        "vote_count": stats.vote_count + deltas["count_delta"],
+        "vote_sum": stats.vote_sum + deltas["sum_delta"],
+    }
+    for value in VOTE_VALUES:
+        column = stats[f"votes_{value}"]
+        values[column.key] = column + deltas[f"votes_{value}_delta"]
+    return (
+        update(models.PostVoteStatsModel.__table__)
+        .where(stats.post_id == deltas["vote_post_id"])
+        .values(**values)
+    )
+
+def rebuild_statements(post_ids=None):
+    """DELETE + INSERT ... SELECT recomputing counters from the vote rows.
+
+    Rebuilds every post when `post_ids` is None.
+    """
+    stats = models.PostVoteStatsModel
+    post, vote = models.PostModel, models.PostVoteModel
+    clear = delete(stats)
+    source = (
+        select(
+            post.id,
+            func.count(vote.id),
+            func.coalesce(func.sum(vote.vote), 0),
+            *[func.coalesce(func.sum(case((vote.vote == value, 1), else_=0)), 0) for value in VOTE_VALUES],
+        )
+        .select_from(post)
+        .outerjoin(vote, vote.post_id == post.id)
+        .group_by(post.id)
+    )
+    if post_ids is not None:
+        clear = clear.where(stats.post_id.in_(post_ids))
+        source = source.where(post.id.in_(post_ids))
+    columns = ["post_id", "vote_count", "vote_sum"] + [histogram_column(value).key for value in VOTE_VALUES]
+    return [clear, insert(stats).from_select(columns, source)]
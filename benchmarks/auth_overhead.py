@@ -0,0 +1,41 @@
+import argparse
+import json
+import time
+
+from .settings import configure
+
+configure()
+
+from app import oauth2
+
+# Auth overhead per request
+# time spent in oauth2.verify_access_token with a cold and a warm token cache
+# python -m benchmarks.auth_overhead --requests 20000
+
+def measure(token, requests, cached):
+    credentials_exception = oauth2.return_credential_exception()
+    oauth2.token_cache.clear()
+    started = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            oauth2.token_cache.clear()
+        oauth2.verify_access_token(token, credentials_exception)
+    elapsed = time.perf_counter() - started
+    return {
+        "token_cache": cached,
+        "requests": requests,
+        "seconds": round(elapsed, 4),
+        "us_per_request": round(elapsed / requests * 1e6, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.auth_overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = oauth2.create_access_token(data={"user_id": 1})
+    results = [measure(token, args.requests, cached=False), measure(token, args.requests, cached=True)]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
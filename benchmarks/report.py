@@ -0,0 +1,34 @@
+import subprocess
+from collections import Counter
+
+# latency summaries shared by the benchmark scenarios
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(name, latencies, statuses, elapsed):
+    """Summary of one scenario run, latencies in seconds."""
+    ordered = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "scenario": name,
+        "requests": len(ordered),
+        "seconds": round(elapsed, 3),
+        "req_per_sec": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        "statuses": dict(sorted(Counter(statuses).items())),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
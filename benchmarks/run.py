@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from .settings import configure
+from .scenarios import SCENARIOS
+
+# Benchmark runner
+# python -m benchmarks.run --database-url sqlite:///./bench.db --seed-users 200 --output bench.json
+
+async def run(args):
+    import httpx
+
+    from app import models
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from .report import git_revision
+    from .scenarios import Targets, run_scenario
+    from .seed import seed
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seeded = None
+        if args.seed_users:
+            seeded = seed(db, users=args.seed_users, posts=args.seed_posts, votes=args.seed_votes, comments=args.seed_comments)
+        targets = Targets.load(db)
+    finally:
+        db.close()
+    if not targets.users or not targets.posts:
+        raise SystemExit("no seeded data, run with --seed-users or python -m benchmarks.seed first!")
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name in args.scenario or list(SCENARIOS):
+            requests = args.login_requests if name == "login_storm" else args.requests
+            results.append(await run_scenario(name, client, targets, requests=requests, concurrency=args.concurrency))
+    return {
+        "revision": git_revision(),
+        "started_at": datetime.utcnow().isoformat(),
+        "database": engine.url.get_backend_name(),
+        "seeded": seeded,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--database-url", help="sqlite file or local postgres, defaults to sqlite:///./bench.db")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed-users", type=int, default=0, help="seed this many users before running")
+    parser.add_argument("--seed-posts", type=int, default=10)
+    parser.add_argument("--seed-votes", type=int, default=10)
+    parser.add_argument("--seed-comments", type=int, default=5)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    configure(args.database_url)
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
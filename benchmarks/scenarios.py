@@ -0,0 +1,89 @@
+import asyncio
+import random
+import time
+
+from .report import summarize
+from .seed import PASSWORD
+
+# In-process load scenarios
+# every scenario is one request against app.main:app through
+# httpx.AsyncClient, picking its target from the seeded data.
+
+class Targets:
+    def __init__(self, users, posts, tokens):
+        self.users = users
+        self.posts = posts
+        self.tokens = tokens
+
+    @classmethod
+    def load(cls, db, sample=500):
+        from sqlalchemy import func, select
+
+        from app import models, oauth2
+
+        users = db.execute(
+            select(models.UserModel.id, models.UserModel.username).order_by(func.random()).limit(sample)
+        ).all()
+        posts = db.execute(
+            select(models.UserModel.username, models.PostModel.puid)
+            .join(models.PostModel, models.PostModel.owner_id == models.UserModel.id)
+            .order_by(func.random())
+            .limit(sample)
+        ).all()
+        tokens = [
+            {"Authorization": f"Bearer {oauth2.create_access_token(data={'user_id': user.id})}"}
+            for user in users
+        ]
+        return cls(users=users, posts=posts, tokens=tokens)
+
+async def feed(client, targets):
+    user = random.choice(targets.users)
+    return await client.get(f"/api/v1/users/{user.username}/posts/", params={"limit": 20})
+
+async def read_post(client, targets):
+    post = random.choice(targets.posts)
+    return await client.get(f"/api/v1/users/{post.username}/posts/{post.puid}")
+
+async def vote_burst(client, targets):
+    # a handful of hot posts takes every vote
+    post = random.choice(targets.posts[:5])
+    return await client.put(
+        f"/api/v1/users/{post.username}/posts/{post.puid}/votes/",
+        json={"vote": random.randrange(6)},
+        headers=random.choice(targets.tokens),
+    )
+
+async def comment_thread(client, targets):
+    post = random.choice(targets.posts[:20])
+    path = f"/api/v1/users/{post.username}/posts/{post.puid}/comments/"
+    if random.random() < 0.3:
+        return await client.post(path, json={"comment": "benchmark comment"}, headers=random.choice(targets.tokens))
+    return await client.get(path, params={"limit": 50})
+
+async def login_storm(client, targets):
+    user = random.choice(targets.users)
+    return await client.post("/auth/token", data={"username": user.username, "password": PASSWORD})
+
+SCENARIOS = {
+    "feed": feed,
+    "read_post": read_post,
+    "vote_burst": vote_burst,
+    "comment_thread": comment_thread,
+    "login_storm": login_storm,
+}
+
+async def run_scenario(name, client, targets, requests=1000, concurrency=16):
+    scenario = SCENARIOS[name]
+    remaining = iter(range(requests))
+    latencies, statuses = [], []
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await scenario(client, targets)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(name, latencies, statuses, time.perf_counter() - started)
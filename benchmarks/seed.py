@@ -0,0 +1,96 @@
+import argparse
+import random
+import time
+from datetime import datetime
+
+from .settings import configure
+
+# Bulk data seeder
+# python -m benchmarks.seed --database-url sqlite:///./bench.db --users 200 --posts 20 --votes 10 --comments 5
+
+PASSWORD = "benchmark"
+
+def chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def seed(db, users=100, posts=10, votes=10, comments=5):
+    """Bulk insert `users` users with `posts` posts each, plus votes and comments per post."""
+    from sqlalchemy import insert, select
+
+    from app import models, utils, vote_stats
+
+    run = time.time_ns()
+    hashed_password = utils.hash_password(PASSWORD)
+    now = datetime.utcnow()
+    db.execute(insert(models.UserModel), [
+        {
+            "name": f"bench user {i}",
+            "username": f"bench-{run}-{i}",
+            "email": f"bench-{run}-{i}@example.com",
+            "hashed_password": hashed_password,
+            "modified_at": now,
+            "created_at": now,
+        }
+        for i in range(users)
+    ])
+    user_ids = db.execute(
+        select(models.UserModel.id).where(models.UserModel.username.like(f"bench-{run}-%"))
+    ).scalars().all()
+
+    puids = random.sample(range(10**8, 10**9), len(user_ids) * posts)
+    post_rows = [
+        {
+            "puid": puids[i * posts + j],
+            "title": f"post {j} of user {user_id}",
+            "description": "seeded by benchmarks.seed " * 4,
+            "owner_id": user_id,
+            "modified_at": now,
+            "created_at": now,
+        }
+        for i, user_id in enumerate(user_ids)
+        for j in range(posts)
+    ]
+    for rows in chunks(post_rows):
+        db.execute(insert(models.PostModel), rows)
+    post_ids = db.execute(
+        select(models.PostModel.id).where(models.PostModel.puid.in_(puids))
+    ).scalars().all()
+
+    vote_rows, comment_rows = [], []
+    for post_id in post_ids:
+        for user_id in random.sample(user_ids, min(votes, len(user_ids))):
+            vote_rows.append({"post_id": post_id, "user_id": user_id, "vote": random.randrange(6), "created_at": now})
+        for _ in range(comments):
+            comment_rows.append({"post_id": post_id, "user_id": random.choice(user_ids), "comment": "seeded comment", "created_at": now})
+    for rows in chunks(vote_rows):
+        db.execute(insert(models.PostVoteModel), rows)
+    for rows in chunks(comment_rows):
+        db.execute(insert(models.PostCommentModel), rows)
+    for statement in vote_stats.rebuild_statements(post_ids):
+        db.execute(statement)
+    db.commit()
+    return {"users": len(user_ids), "posts": len(post_ids), "votes": len(vote_rows), "comments": len(comment_rows)}
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed")
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=10, help="posts per user")
+    parser.add_argument("--votes", type=int, default=10, help="votes per post")
+    parser.add_argument("--comments", type=int, default=5, help="comments per post")
+    args = parser.parse_args()
+    configure(args.database_url)
+
+    from app import models
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(seed(db, users=args.users, posts=args.posts, votes=args.votes, comments=args.comments))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from .settings import configure
+
+configure()
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from app import models, schemas
+from app.responses import AppJSONResponse, ModelJSONRoute
+
+# Response serialization cost for list pages
+# one GetPostPage of --page-size posts, each with --comments comments,
+# requested through an app configured like app.main over an in-process ASGI
+# client: FastAPI's stock JSONResponse, AppJSONResponse (orjson) on a plain
+# APIRoute, and ModelJSONRoute's direct pydantic-core dump
+# python -m benchmarks.serialization --page-size 100 --comments 10
+
+def build_page(page_size, comments):
+    now = datetime.utcnow()
+    owner = models.UserModel(id=1, username="bench")
+    posts = []
+    for index in range(page_size):
+        post = models.PostModel(
+            id=index, puid=index, title=f"post {index}", description="benchmark post",
+            version=1, modified_at=now, created_at=now, owner_id=owner.id, owner=owner,
+        )
+        post.score = models.PostVoteStatsModel(
+            post_id=index, vote_count=10, vote_sum=35,
+            votes_0=0, votes_1=1, votes_2=2, votes_3=2, votes_4=2, votes_5=3,
+        )
+        post.post_comments = [
+            models.PostCommentModel(id=index * comments + number, comment=f"comment {number}")
+            for number in range(comments)
+        ]
+        posts.append(post)
+    return {"items": posts, "limit": page_size, "next_cursor": "x" * 40, "prev_cursor": None}
+
+def build_app(page):
+    app = FastAPI(default_response_class=AppJSONResponse)
+    for name, route_class, response_class in (
+        ("stock", APIRoute, JSONResponse),
+        ("orjson", APIRoute, None),
+        ("model_route", ModelJSONRoute, None),
+    ):
+        router = APIRouter(route_class=route_class)
+        options = {"response_class": response_class} if response_class else {}
+
+        async def read_page():
+            return page
+
+        router.add_api_route(f"/{name}", read_page, response_model=schemas.GetPostPage, **options)
+        app.include_router(router)
+    model_route = next(route for route in app.routes if route.path == "/model_route")
+    if not model_route.uses_default_response_class():
+        raise RuntimeError("ModelJSONRoute is not serializing the benchmark route!")
+    return app
+
+async def measure(client, name, requests):
+    body = (await client.get(f"/{name}")).content
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(f"/{name}")
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return {
+        "renderer": name,
+        "requests": requests,
+        "bytes": len(body),
+        "seconds": round(elapsed, 4),
+        "us_per_request": round(elapsed / requests * 1e6, 2),
+    }
+
+async def run(page, requests):
+    transport = httpx.ASGITransport(app=build_app(page))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return [await measure(client, name, requests) for name in ("stock", "orjson", "model_route")]
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    page = build_page(args.page_size, args.comments)
+    results = asyncio.run(run(page, args.requests))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+
+# app.config reads its settings at import time, benchmarks only need a database
+
+DEFAULT_DATABASE_URL = "sqlite:///./bench.db"
+
+def configure(database_url=None):
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    os.environ.setdefault("ALLOWED_ORIGINS", "*")
+    # one client drives the whole load, throttling it would measure the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+    os.environ.setdefault("ADMISSION_MAX_POOL_WAITERS", "0")
+    return os.environ["DATABASE_URL"]
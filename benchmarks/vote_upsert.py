@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from .settings import configure
+
+configure()
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app import models, vote_stats
+from app.database import get_async_database_url
+
+# Votes/sec under concurrent clients
+# compares the original read-then-write vote path with the single upsert
+# python -m benchmarks.vote_upsert --clients 16 --votes 2000
+
+async def legacy_vote(db, post_id, user_id, value):
+    vote_query = select(models.PostVoteModel).where(
+        (models.PostVoteModel.post_id == post_id) &
+        (models.PostVoteModel.user_id == user_id)
+    )
+    post_vote = (await db.execute(vote_query)).scalars().first()
+    await db.execute(vote_stats.record_vote(post_id, post_vote.vote if post_vote else None, value))
+    if not post_vote:
+        post_vote = models.PostVoteModel(post_id=post_id, user_id=user_id, vote=value)
+        db.add(post_vote)
+        await db.commit()
+        await db.refresh(post_vote)
+    else:
+        post_vote.vote = value
+        await db.commit()
+
+async def upsert_vote(db, post_id, user_id, value):
+    await db.execute(vote_stats.lock_stats([post_id]))
+    old_votes = dict((await db.execute(vote_stats.previous_votes([post_id], user_id))).all())
+    await db.execute(vote_stats.record_vote(post_id, old_votes.get(post_id), value))
+    await db.execute(vote_stats.upsert_vote(db.bind.dialect.name, post_id, user_id, value))
+    await db.commit()
+
+STRATEGIES = {
+    "legacy": legacy_vote,
+    "upsert": upsert_vote,
+}
+
+async def seed(Session, voters):
+    async with Session() as db:
+        owner = models.UserModel(name="owner", username=f"owner-{time.time_ns()}", email=f"owner-{time.time_ns()}@example.com", hashed_password="-")
+        users = [
+            models.UserModel(name=f"voter {i}", username=f"voter-{time.time_ns()}-{i}", email=f"voter-{time.time_ns()}-{i}@example.com", hashed_password="-")
+            for i in range(voters)
+        ]
+        db.add_all([owner] + users)
+        await db.flush()
+        post = models.PostModel(puid=random.randrange(10**8, 10**9), title="hot post", owner_id=owner.id)
+        post.score = models.PostVoteStatsModel()
+        db.add(post)
+        await db.commit()
+        return post.id, [user.id for user in users]
+
+async def run(strategy, Session, post_id, user_ids, clients, votes):
+    vote = STRATEGIES[strategy]
+    remaining = iter(range(votes))
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        async with Session() as db:
+            for _ in remaining:
+                try:
+                    await vote(db, post_id, random.choice(user_ids), random.randrange(6))
+                except DBAPIError:
+                    errors += 1
+                    await db.rollback()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    async with Session() as db:
+        rows = (await db.execute(select(func.count()).where(models.PostVoteModel.post_id == post_id))).scalar()
+        pairs = (await db.execute(
+            select(func.count(func.distinct(models.PostVoteModel.user_id))).where(models.PostVoteModel.post_id == post_id)
+        )).scalar()
+    return {
+        "strategy": strategy,
+        "clients": clients,
+        "votes": votes,
+        "seconds": round(elapsed, 3),
+        "votes_per_sec": round(votes / elapsed, 1),
+        "errors": errors,
+        "duplicate_rows": rows - pairs,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.vote_upsert")
+    parser.add_argument("--database-url", default=os.environ["DATABASE_URL"])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--voters", type=int, default=50)
+    parser.add_argument("--strategy", choices=list(STRATEGIES), action="append")
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_async_database_url(args.database_url))
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    results = []
+    for strategy in args.strategy or list(STRATEGIES):
+        post_id, user_ids = await seed(Session, args.voters)
+        results.append(await run(strategy, Session, post_id, user_ids, args.clients, args.votes))
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from pathlib import Path
+
+# app.config reads its settings at import time, point it at a throwaway
+# sqlite database before anything imports the app
+DATA_DIR = tempfile.mkdtemp(prefix="fastapi_demo_tests_")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{DATA_DIR}/app.db",
+    SECRET_KEY="tests",
+    ALGORITHM="HS256",
+    ACCESS_TOKEN_EXPIRE_MINUTES="30",
+    ENVIRONMENT="test",
+    ALLOWED_ORIGINS="http://frontend.test",
+    HASH_WORKERS="0",
+    JOBS_IN_PROCESS="false",
+    FEED_RECOMPUTE_SECONDS="0",
+    RESPONSE_CACHE_SYNC_SECONDS="0",
+    RATE_LIMIT_ENABLED="false",
+    SLOW_QUERY_EXPLAIN="false",
+    ADMIN_TOKEN="admin-token",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models, replicas
+from app.database import create_app_engine, engine
+from app.jobs import job_queue
+from app.main import app
+from app.oauth2 import token_cache, user_cache
+from app.replicas import ReplicaRouter
+from app.response_cache import response_cache
+
+models.Base.metadata.create_all(bind=engine)
+
+@pytest.fixture
+def client():
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    for cache in (user_cache, token_cache, response_cache):
+        cache.clear()
+    response_cache.shared_generation = 0
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def drain(client):
+    """Run the queued jobs, the app runs without its in-process worker."""
+    return lambda: client.portal.call(job_queue.drain)
+
+def replica_database(name):
+    """A replica file holding one user named after it, so reads tell where they went."""
+    path = Path(DATA_DIR) / f"{name}.db"
+    path.unlink(missing_ok=True)
+    url = f"sqlite:///{path}"
+    bind = create_app_engine(url)
+    models.Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        conn.execute(models.UserModel.__table__.insert().values(name=name, username=name, email=f"{name}@example.com", hashed_password="x"))
+    bind.dispose()
+    return url
+
+@pytest.fixture
+def use_replicas(client, monkeypatch):
+    routers = []
+
+    def use(*urls, sticky_seconds=5, recent_writers=None):
+        router = ReplicaRouter(urls, sticky_seconds=sticky_seconds, recent_writers=recent_writers)
+        monkeypatch.setattr(replicas, "replica_router", router)
+        routers.append(router)
+        return router
+
+    yield use
+    for router in routers:
+        client.portal.call(router.dispose)
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+def create_user(client, username):
+    response = client.post("/api/v1/users/", json={"name": username, "username": username, "email": f"{username}@example.com", "hashed_password": "secret"})
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/token", data={"username": username, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_post(client, headers, username, title="title"):
+    response = client.post(f"/api/v1/users/{username}/posts/", json={"title": title, "description": "description"}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["puid"]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import cache
+from app.cache import MemoryCache, RedisCache
+from app.oauth2 import user_cache
+from .conftest import ADMIN, create_post, create_user
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def test_entries_expire_after_their_ttl(clock):
+    memory = MemoryCache(ttl=10)
+    memory.set("default", 1)
+    memory.set("short", 2, ttl=1)
+    clock.value += 5
+    assert memory.get("default") == 1
+    assert memory.get("short") is None
+    clock.value += 5
+    assert memory.get("default") is None
+    assert memory.stats() == {"hits": 1, "misses": 2, "size": 0, "maxsize": 1024}
+
+def test_least_recently_used_entry_is_evicted():
+    memory = MemoryCache(maxsize=2)
+    memory.set("a", 1)
+    memory.set("b", 2)
+    assert memory.get("a") == 1
+    memory.set("c", 3)
+    assert memory.get("b") is None
+    assert (memory.get("a"), memory.get("c")) == (1, 3)
+    assert len(memory) == 2
+
+def test_redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    redis = RedisCache(client, prefix="test", ttl=30)
+    redis.set("user", {"id": 1})
+    redis.set("short", "value", ttl=0.5)
+    assert redis.get("user") == {"id": 1}
+    assert 0 < client.ttl("test:user") <= 30
+    # sub-second ttls are rounded up, redis expires in whole seconds
+    assert client.ttl("test:short") == 1
+    redis.delete("user")
+    assert redis.get("user") is None
+    client.set("other:key", "kept")
+    redis.clear()
+    assert redis.get("short") is None
+    assert client.get("other:key") == b"kept"
+    assert redis.stats() == {"hits": 1, "misses": 2}
+
+def test_user_update_and_delete_invalidate_the_cached_user(client):
+    headers = create_user(client, "alice")
+    create_post(client, headers, "alice")
+    user_id = client.get("/api/v1/users/alice").json()["id"]
+    assert user_cache.get(user_id).name == "alice"
+    assert client.put("/api/v1/users/alice", json={"name": "Alice"}, headers=headers).status_code == 200
+    assert user_cache.get(user_id) is None
+    create_post(client, headers, "alice")
+    assert user_cache.get(user_id).name == "Alice"
+    assert client.delete("/api/v1/users/alice", headers=headers).status_code == 202
+    assert user_cache.get(user_id) is None
+    # the token outlives the user, the cache must not
+    response = client.post("/api/v1/users/alice/posts/", json={"title": "title"}, headers=headers)
+    assert response.status_code == 403
+
+def test_cache_counters_are_exported(client):
+    headers = create_user(client, "alice")
+    create_post(client, headers, "alice")
+    create_post(client, headers, "alice")
+    metrics = client.get("/metrics", headers=ADMIN).text
+    assert 'cache_hits_total{cache="user"}' in metrics
+    assert 'cache_misses_total{cache="token"}' in metrics
+    assert client.get("/status/caches", headers=ADMIN).json()["user"]["hits"] >= 1
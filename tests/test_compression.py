@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from app import compression
+from app.compression import CompressionMiddleware, negotiate
+from .conftest import ADMIN, create_user
+
+def test_negotiation_prefers_brotli_and_honours_q_values():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("br;q=0, gzip") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("identity") is None
+    assert negotiate("") is None
+    if "br" in compression.ENCODERS:
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("*") == "br"
+
+def test_brotli_is_available():
+    pytest.importorskip("brotli")
+    assert list(compression.ENCODERS) == ["br", "gzip"]
+
+def create_long_post(client, headers):
+    response = client.post("/api/v1/users/alice/posts/", json={"title": "title", "description": "x" * 2000}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["puid"]
+
+def test_small_bodies_go_out_uncompressed(client):
+    create_user(client, "alice")
+    response = client.get("/api/v1/users/alice", headers={"Accept-Encoding": "gzip"})
+    assert len(response.content) < 500
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_variant_etag_revalidates_to_304(client):
+    alice = create_user(client, "alice")
+    puid = create_long_post(client, alice)
+    url = f"/api/v1/users/alice/posts/{puid}"
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["description"] == "x" * 2000
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+    assert client.get(url, headers={"Accept-Encoding": "identity"}).headers["etag"] == etag.replace("-gzip", "")
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    # routing's route label survives the If-None-Match rewrite
+    metrics = client.get("/metrics", headers=ADMIN).text
+    assert 'route="/api/v1/users/{username}/posts/{puid}",status="304"' in metrics
+
+def test_streamed_chunks_are_flushed_one_by_one():
+    chunks = [b'{"id": %d}\n' % index * 10 for index in range(3)]
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    decompressor = zlib.decompressobj(31)
+    # every chunk decodes as soon as it arrives
+    assert [decompressor.decompress(body["body"]) for body in bodies] == chunks
+    assert gzip.decompress(b"".join(body["body"] for body in bodies)) == b"".join(chunks)
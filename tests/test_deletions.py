@@ -0,0 +1,85 @@
+from sqlalchemy import select, update
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.jobs import job_queue
+from .conftest import ADMIN, create_post, create_user
+
+def delete_post(client, headers, puid):
+    response = client.delete(f"/api/v1/users/alice/posts/{puid}", headers=headers)
+    assert response.status_code == 202, response.text
+    return response.headers["Location"], response.json()
+
+def post_with_votes(client, alice, voters):
+    puid = create_post(client, alice, "alice")
+    for headers in voters:
+        response = client.put(f"/api/v1/users/alice/posts/{puid}/votes/", json={"vote": 3}, headers=headers)
+        assert response.status_code == 200, response.text
+    return puid
+
+def test_post_is_tombstoned_then_purged(client, drain):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    puid = post_with_votes(client, alice, [alice, bob])
+    assert client.post(f"/api/v1/users/alice/posts/{puid}/comments/", json={"comment": "hi"}, headers=bob).status_code == 201
+    location, deletion = delete_post(client, alice, puid)
+    assert (deletion["kind"], deletion["status"], deletion["rows_deleted"]) == ("post", "pending", 0)
+    # tombstoned: gone from reads before the purge runs
+    assert client.get(f"/api/v1/users/alice/posts/{puid}").status_code == 404
+    drain()
+    deletion = client.get(location, headers=alice).json()
+    assert (deletion["status"], deletion["rows_deleted"]) == ("done", 4)
+    assert deletion["finished_at"] is not None
+    with SessionLocal() as db:
+        assert db.scalars(select(models.PostVoteModel)).all() == []
+        assert db.scalars(select(models.PostModel)).all() == []
+
+def test_deletion_is_readable_by_its_owner_and_the_admin(client):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    location, _ = delete_post(client, alice, create_post(client, alice, "alice"))
+    assert client.get(location, headers=alice).status_code == 200
+    assert client.get(location, headers=ADMIN).status_code == 200
+    assert client.get(location, headers=bob).status_code == 403
+    assert client.get(location).status_code == 401
+    assert client.get(location, headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.get("/api/v1/deletions/999999", headers=alice).status_code == 404
+
+def test_deleted_user_follows_their_own_purge(client, drain):
+    alice = create_user(client, "alice")
+    create_post(client, alice, "alice")
+    response = client.delete("/api/v1/users/alice", headers=alice)
+    assert response.status_code == 202, response.text
+    drain()
+    deletion = client.get(response.headers["Location"], headers=alice).json()
+    assert (deletion["kind"], deletion["status"], deletion["rows_deleted"]) == ("user", "done", 2)
+
+def test_purge_stops_when_another_worker_claims_it(client, drain, monkeypatch):
+    monkeypatch.setattr(settings, "purge_batch_size", 1)
+    alice = create_user(client, "alice")
+    voters = [create_user(client, f"voter{index}") for index in range(4)]
+    location, _ = delete_post(client, alice, post_with_votes(client, alice, voters))
+    renew = job_queue.backend.renew
+    renewals = []
+
+    async def claimed_after_two_chunks(db, job):
+        renewals.append(job.id)
+        if len(renewals) == 3:
+            # as if another worker claimed the job once this run's lease ran out,
+            # sqlite cannot take a second writer while the chunk is uncommitted
+            await db.execute(update(models.JobModel).where(models.JobModel.id == job.id).values(attempts=models.JobModel.attempts + 1))
+        return await renew(db, job)
+
+    monkeypatch.setattr(job_queue.backend, "renew", claimed_after_two_chunks)
+    client.portal.call(job_queue.run_pending)
+    # the second chunk was rolled back, the job is left to the other worker
+    deletion = client.get(location, headers=alice).json()
+    assert (deletion["status"], deletion["rows_deleted"]) == ("running", 1)
+    with SessionLocal() as db:
+        assert db.execute(select(models.JobModel.name, models.JobModel.status)).all() == [("purge", "pending")]
+        db.execute(update(models.JobModel).values(run_at=models.JobModel.created_at))
+        db.commit()
+    monkeypatch.setattr(job_queue.backend, "renew", renew)
+    drain()
+    deletion = client.get(location, headers=alice).json()
+    # 4 votes and the post, each counted once
+    assert (deletion["status"], deletion["rows_deleted"]) == ("done", 5)
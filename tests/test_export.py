@@ -0,0 +1,34 @@
+import orjson
+import pytest
+
+from app.config import settings
+from .conftest import ADMIN, create_post, create_user
+
+EXPORTS = ["/api/v1/export/posts.ndjson", "/api/v1/export/votes.ndjson", "/api/v1/export/comments.ndjson"]
+
+def lines(response):
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+def test_exports_stream_every_row(client):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    puid = create_post(client, alice, "alice")
+    create_post(client, bob, "bob")
+    client.put(f"/api/v1/users/alice/posts/{puid}/votes/", json={"vote": 3}, headers=bob)
+    client.post(f"/api/v1/users/alice/posts/{puid}/comments/", json={"comment": "hi"}, headers=bob)
+    posts, votes, comments = (client.get(url, headers=ADMIN) for url in EXPORTS)
+    assert posts.headers["content-type"] == "application/x-ndjson"
+    assert sorted(row["username"] for row in lines(posts)) == ["alice", "bob"]
+    assert [row["vote"] for row in lines(votes)] == [3]
+    assert [row["comment"] for row in lines(comments)] == ["hi"]
+    later = client.get(EXPORTS[0], params={"updated_since": "2999-01-01T00:00:00Z"}, headers=ADMIN)
+    assert lines(later) == []
+
+@pytest.mark.parametrize("url", EXPORTS)
+def test_exports_need_the_admin_token(client, monkeypatch, url):
+    alice = create_user(client, "alice")
+    assert client.get(url).status_code == 403
+    # a user's own token does not open everyone's data
+    assert client.get(url, headers=alice).status_code == 403
+    assert client.get(url, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    monkeypatch.setattr(settings, "admin_token", None)
+    assert client.get(url, headers=ADMIN).status_code == 403
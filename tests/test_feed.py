@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app import feed, leases
+from app.database import AsyncSessionLocal, async_engine
+from .conftest import create_post, create_user
+
+def test_decay_converts_aware_timestamps_to_utc():
+    now = datetime(2026, 1, 1, 12, 0)
+    naive = now - timedelta(hours=3)
+    aware = naive.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5, minutes=30)))
+    assert feed.decay_factor(aware, now) == feed.decay_factor(naive, now)
+
+def test_feed_orders_posts_by_score(client, drain):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    quiet, voted = create_post(client, alice, "alice", "quiet"), create_post(client, alice, "alice", "voted")
+    client.put(f"/api/v1/users/alice/posts/{voted}/votes/", json={"vote": 5}, headers=bob)
+    drain()
+    assert [post["puid"] for post in client.get("/api/v1/feed/").json()["items"]] == [voted, quiet]
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+def test_one_holder_gets_the_lease_until_it_expires(client):
+    acquire = lambda holder, seconds=60: run(leases.acquire(AsyncSessionLocal, "test", seconds, holder))
+    assert acquire("worker-1")
+    assert not acquire("worker-2")
+    # the holder renews, an expired lease goes to whoever asks
+    assert acquire("worker-1", seconds=-1)
+    assert acquire("worker-2")
+    assert not acquire("worker-1")
+
+def test_decay_loop_logs_failures(client, monkeypatch, caplog):
+    async def fail(sessionmaker):
+        raise RuntimeError("boom")
+
+    async def stop(seconds):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(feed, "recompute_decay", fail)
+    monkeypatch.setattr(feed, "asyncio", SimpleNamespace(sleep=stop))
+    with caplog.at_level(logging.ERROR, logger="app.feed"):
+        try:
+            run(feed.run_decay_loop(AsyncSessionLocal))
+        except asyncio.CancelledError:
+            pass
+    assert "feed decay recompute failed!" in caplog.text
+    assert "boom" in caplog.text
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import sha256_crypt
+from sqlalchemy import select
+
+from app import models, utils
+from app.database import SessionLocal
+from app.hashing import PasswordHasher, password_hasher
+from .conftest import create_user
+
+def test_hash_and_verify():
+    hashed = utils.hash_password("secret")
+    assert hashed.startswith("$2b$")
+    assert utils.verify_and_update_password("secret", hashed) == (True, None)
+    assert utils.verify_and_update_password("wrong", hashed) == (False, None)
+
+def test_legacy_hash_needs_rehash():
+    valid, new_hash = utils.verify_and_update_password("secret", sha256_crypt.hash("secret"))
+    assert valid and new_hash.startswith("$2b$")
+
+def test_login_rehashes_a_legacy_hash(client):
+    create_user(client, "alice")
+    with SessionLocal() as db:
+        user = db.scalars(select(models.UserModel).where(models.UserModel.username == "alice")).one()
+        user.hashed_password = sha256_crypt.hash("secret")
+        db.commit()
+    assert client.post("/auth/token", data={"username": "alice", "password": "secret"}).status_code == 200
+    with SessionLocal() as db:
+        hashed = db.scalars(select(models.UserModel.hashed_password).where(models.UserModel.username == "alice")).one()
+    assert hashed.startswith("$2b$")
+    assert client.post("/auth/token", data={"username": "alice", "password": "secret"}).status_code == 200
+
+def test_saturated_hasher_fails_fast():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    hasher.pending = 1
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(hasher.hash_password("secret"))
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+
+def test_login_gets_503_while_hashes_are_pending(client, monkeypatch):
+    create_user(client, "alice")
+    monkeypatch.setattr(password_hasher, "pending", password_hasher.max_pending)
+    response = client.post("/auth/token", data={"username": "alice", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_bcrypt_backend_loads_without_a_trapped_error():
+    # passlib 1.7.4 logs a traceback reading bcrypt>=4.1's missing __about__
+    code = "from app.utils import hash_password; hash_password('secret')"
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1], env=os.environ, capture_output=True, text=True, check=True)
+    assert "trapped" not in result.stderr
@@ -0,0 +1,60 @@
+from app.queries import assert_max_statements
+from app.response_cache import response_cache
+from .conftest import create_post, create_user
+
+def revalidate(client, url, headers):
+    # uncompressed, the ETag stays the handler's
+    return client.get(url, headers={"Accept-Encoding": "identity", **headers})
+
+def test_post_revalidates_from_a_version_only_lookup(client):
+    alice = create_user(client, "alice")
+    puid = create_post(client, alice, "alice")
+    url = f"/api/v1/users/alice/posts/{puid}"
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    # past the response cache, straight to the version-only lookup
+    response_cache.clear()
+    with assert_max_statements(1):
+        assert revalidate(client, url, {"If-None-Match": etag}).status_code == 304
+    response_cache.clear()
+    not_modified = revalidate(client, url, {"If-Modified-Since": last_modified})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert client.put(f"{url}/votes/", json={"vote": 4}, headers=alice).status_code == 200
+    response = revalidate(client, url, {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["score"]["vote_count"] == 1
+
+def test_user_revalidates(client):
+    alice = create_user(client, "alice")
+    url = "/api/v1/users/alice"
+    response = client.get(url)
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+    assert client.put(url, json={"name": "Alice"}, headers=alice).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Alice"
+
+def test_comment_pages_carry_their_own_etag(client):
+    alice = create_user(client, "alice")
+    puid = create_post(client, alice, "alice")
+    url = f"/api/v1/users/alice/posts/{puid}/comments/"
+    for index in range(3):
+        assert client.post(url, json={"comment": f"comment {index}"}, headers=alice).status_code == 201
+    first = client.get(url, params={"limit": 2})
+    second = client.get(url, params={"limit": 2, "cursor": first.json()["next_cursor"]})
+    assert [item["comment"] for item in second.json()["items"]] == ["comment 2"]
+    assert first.headers["etag"] != second.headers["etag"]
+    assert client.get(url).headers["etag"] != first.headers["etag"]
+    # page 1's tag does not answer for page 2
+    response = client.get(url, params={"limit": 2, "cursor": first.json()["next_cursor"]}, headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert client.get(url, params={"limit": 2}, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get(url, params={"limit": 2}, headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+    assert client.post(url, json={"comment": "comment 3"}, headers=alice).status_code == 201
+    assert client.get(url, params={"limit": 2}, headers={"If-None-Match": first.headers["etag"]}).status_code == 200
@@ -0,0 +1,46 @@
+import logging
+
+from sqlalchemy import select
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.jobs import job_queue
+
+calls = []
+
+@job_queue.job("test_flaky")
+async def flaky(db, fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError("flaky")
+
+def enqueue(client, **payload):
+    async def add():
+        async with job_queue.sessionmaker() as db:
+            await flaky.enqueue(db, **payload)
+            await db.commit()
+    client.portal.call(add)
+
+def jobs():
+    with SessionLocal() as db:
+        return db.execute(select(models.JobModel.status, models.JobModel.attempts)).all()
+
+def test_job_is_retried_until_it_succeeds(client, drain, monkeypatch):
+    monkeypatch.setattr(settings, "jobs_retry_seconds", 0)
+    calls.clear()
+    enqueue(client, fail_times=2)
+    drain()
+    assert len(calls) == 3
+    assert jobs() == []
+
+def test_job_is_kept_as_failed_after_max_attempts(client, drain, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "jobs_retry_seconds", 0)
+    monkeypatch.setattr(settings, "jobs_max_attempts", 3)
+    calls.clear()
+    enqueue(client, fail_times=10)
+    with caplog.at_level(logging.ERROR, logger="app.jobs"):
+        drain()
+    assert len(calls) == 3
+    assert jobs() == [("failed", 3)]
+    assert "job test_flaky" in caplog.text and "failed!" in caplog.text
@@ -0,0 +1,49 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import oauth2
+from app.config import settings
+from app.oauth2 import token_cache, token_digest, verify_access_token
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+def make_token(expires_in, **claims):
+    exp = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    return jwt.encode({"user_id": 1, "exp": exp, **claims}, settings.secret_key, algorithm=settings.algorithm)
+
+def verify(token):
+    return verify_access_token(token, oauth2.return_credential_exception())
+
+def test_cached_token_stops_validating_at_its_exp():
+    token = make_token(2)
+    assert verify(token).user_id == 1
+    assert token_cache.get(token_digest(token)) is not None
+    # cached for what is left of its lifetime, not the cache's default ttl
+    exp = jwt.get_unverified_claims(token)["exp"]
+    time.sleep(max(0.0, exp - time.time()) + 0.1)
+    assert token_cache.get(token_digest(token)) is None
+    # python-jose compares exp to the current whole second
+    time.sleep(max(0.0, exp + 1 - time.time()) + 0.05)
+    with pytest.raises(HTTPException) as error:
+        verify(token)
+    assert error.value.status_code == 401
+
+@pytest.mark.parametrize("token", [
+    "not a token",
+    make_token(-10),
+    make_token(60, user_id=None),
+    jwt.encode({"user_id": 1}, "another key", algorithm="HS256"),
+])
+def test_rejected_tokens_are_never_cached(token):
+    with pytest.raises(HTTPException):
+        verify(token)
+    assert token_cache.get(token_digest(token)) is None
+    assert len(token_cache) == 0
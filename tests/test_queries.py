@@ -0,0 +1,46 @@
+import pytest
+
+from app.queries import assert_max_statements, count_statements
+from app.response_cache import response_cache
+from .conftest import create_post, create_user
+
+# statement budgets of the read endpoints, independent of the page size:
+# a loader falling back to lazy loads makes these grow with every row
+
+@pytest.fixture
+def posts(client, drain):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    puids = [create_post(client, alice, "alice", f"post {index}") for index in range(10)]
+    for puid in puids:
+        for headers in (alice, bob):
+            assert client.put(f"/api/v1/users/alice/posts/{puid}/votes/", json={"vote": 4}, headers=headers).status_code == 200
+            assert client.post(f"/api/v1/users/alice/posts/{puid}/comments/", json={"comment": "comment"}, headers=headers).status_code == 201
+    drain()
+    return puids
+
+def get(client, url, **params):
+    # measure the database path, not the response cache
+    response_cache.clear()
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+@pytest.mark.parametrize("url, limit", [
+    ("/api/v1/users/alice/posts/", 3),
+    ("/api/v1/users/alice/posts/{puid}", 2),
+    ("/api/v1/users/alice/posts/{puid}/votes/", 2),
+    ("/api/v1/users/alice/posts/{puid}/comments/", 2),
+    ("/api/v1/feed/", 2),
+])
+def test_read_statement_budget(client, posts, url, limit):
+    url = url.format(puid=posts[0])
+    with assert_max_statements(limit):
+        get(client, url, limit=100)
+
+@pytest.mark.parametrize("url", ["/api/v1/users/alice/posts/", "/api/v1/feed/"])
+def test_listing_cost_does_not_grow_with_page_size(client, posts, url):
+    with count_statements() as one:
+        get(client, url, limit=1)
+    with count_statements() as ten:
+        assert len(get(client, url, limit=10).json()["items"]) == 10
+    assert len(ten) == len(one)
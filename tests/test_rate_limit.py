@@ -0,0 +1,53 @@
+import pytest
+
+from app import admission
+from app.config import settings
+from app.rate_limit import MemoryRateLimitStore, RedisRateLimitStore, parse_limit, rate_limit_store
+
+ORIGIN = {"Origin": "http://frontend.test"}
+
+@pytest.fixture
+def limited(client, monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limits", {"GET /api/v1/users/": "2/minute"})
+    rate_limit_store._buckets.clear()
+    yield client
+    rate_limit_store._buckets.clear()
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == (10, 10 / 60)
+    with pytest.raises(ValueError):
+        parse_limit("10/fortnight")
+
+def test_bucket_refills_at_its_rate():
+    store = MemoryRateLimitStore()
+    assert [store.take("key", 2, 2.0) for _ in range(2)] == [0, 0]
+    assert 0 < store.take("key", 2, 2.0) <= 0.5
+    assert store.take("other", 2, 2.0) == 0
+
+def test_redis_store_shares_buckets():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis()
+    first, second = RedisRateLimitStore(client), RedisRateLimitStore(client)
+    assert first.take("key", 2, 1 / 60) == 0
+    assert second.take("key", 2, 1 / 60) == 0
+    assert 0 < first.take("key", 2, 1 / 60) <= 60
+    assert 0 < client.ttl("ratelimit:key") <= 121
+
+def test_limited_requests_get_429_with_cors_headers(limited):
+    assert [limited.get("/api/v1/users/", headers=ORIGIN).status_code for _ in range(2)] == [200, 200]
+    response = limited.get("/api/v1/users/", headers=ORIGIN)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+    assert response.headers["access-control-allow-origin"] == "http://frontend.test"
+    assert "Retry-After" in response.headers["access-control-expose-headers"]
+    # other routes keep their own buckets
+    assert limited.get("/").status_code == 200
+
+def test_shed_requests_get_503_with_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(admission.load_metrics, "in_flight", settings.admission_max_in_flight)
+    response = client.get("/api/v1/users/", headers=ORIGIN)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.admission_retry_after)
+    assert response.headers["access-control-allow-origin"] == "http://frontend.test"
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from app import replicas
+from app.cache import RedisCache
+from .conftest import DATA_DIR, create_post, create_user, replica_database
+
+def read_from(client, headers=None):
+    response = client.get("/api/v1/users/", headers=headers)
+    assert response.status_code == 200, response.text
+    return [user["username"] for user in response.json()["items"]]
+
+def test_reads_go_round_robin(client, use_replicas):
+    use_replicas(replica_database("r1"), replica_database("r2"))
+    assert [read_from(client) for _ in range(4)] == [["r1"], ["r2"], ["r1"], ["r2"]]
+
+def test_writer_reads_its_writes_from_the_primary(client, use_replicas):
+    use_replicas(replica_database("r1"), replica_database("r2"), sticky_seconds=0.5)
+    # signing up is anonymous, the client address is pinned
+    headers = create_user(client, "alice")
+    assert read_from(client) == ["alice"]
+    assert read_from(client, headers) == ["r1"]
+    # a write with a token pins the user
+    create_post(client, headers, "alice")
+    assert read_from(client, headers) == ["alice"]
+    time.sleep(0.6)
+    assert read_from(client, headers) == ["r2"]
+    assert read_from(client) == ["r1"]
+
+def test_unhealthy_replica_is_skipped(client, use_replicas):
+    router = use_replicas(replica_database("r1"), f"sqlite:///{DATA_DIR}/missing/r2.db")
+    assert [read_from(client) for _ in range(3)] == [["r1"], ["r1"], ["r1"]]
+    assert [replica.healthy for replica in router.replicas] == [True, False]
+
+def test_primary_serves_when_no_replica_is_healthy(client, use_replicas):
+    router = use_replicas(replica_database("r1"))
+    create_user(client, "alice")
+    router.recent_writers.clear()
+    assert read_from(client) == ["r1"]
+    router.replicas[0].mark_unhealthy()
+    assert read_from(client) == ["alice"]
+
+def test_stickiness_is_shared_through_a_redis_store(client, use_replicas, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    shared = fakeredis.FakeRedis()
+    url = replica_database("r1")
+    # two workers, each with its own router over the same store
+    first = use_replicas(url, recent_writers=RedisCache(shared, prefix="sticky"))
+    second = use_replicas(url, recent_writers=RedisCache(shared, prefix="sticky"))
+    monkeypatch.setattr(replicas, "replica_router", first)
+    headers = create_user(client, "alice")
+    create_post(client, headers, "alice")
+    monkeypatch.setattr(replicas, "replica_router", second)
+    assert read_from(client, headers) == ["alice"]
+    # signing up pinned the address, posting the user, both for sticky_seconds
+    keys = shared.keys("sticky:*")
+    assert sorted(key.split(b":")[1] for key in keys) == [b"ip", b"user"]
+    assert all(0 < shared.ttl(key) <= 5 for key in keys)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app import tasks
+from app.cache import MemoryCache
+from app.database import AsyncSessionLocal
+from app.response_cache import ResponseCache, response_cache
+from .conftest import create_post, create_user, replica_database
+
+def test_concurrent_misses_share_one_render():
+    cache = ResponseCache(MemoryCache())
+    renders = []
+
+    async def render():
+        renders.append(1)
+        await asyncio.sleep(0.01)
+        return {"body": b"{}"}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_render("key", render) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"body": b"{}"}] * 5
+    assert len(renders) == 1
+    assert cache.get("key") == {"body": b"{}"}
+
+def test_waiters_render_when_the_leader_is_cancelled():
+    cache = ResponseCache(MemoryCache())
+    renders = []
+
+    async def render():
+        renders.append(1)
+        await asyncio.sleep(0.01)
+        return {"body": len(renders)}
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_render("key", render))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_render("key", render)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    # one waiter takes over the render, the others share it
+    assert asyncio.run(main()) == [{"body": 2}] * 3
+    assert len(renders) == 2
+
+def test_render_errors_reach_every_waiter():
+    cache = ResponseCache(MemoryCache())
+
+    async def render():
+        await asyncio.sleep(0.01)
+        raise LookupError("gone")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_render("key", render) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [LookupError] * 3
+    assert cache.get("key") is None
+
+def test_writes_invalidate_the_cached_post(client):
+    alice = create_user(client, "alice")
+    puid = create_post(client, alice, "alice")
+    url = f"/api/v1/users/alice/posts/{puid}"
+    assert client.get(url).json()["score"]["vote_count"] == 0
+    assert client.get("/api/v1/users/alice/posts/").json()["items"][0]["title"] == "title"
+
+    assert client.put(f"{url}/votes/", json={"vote": 5}, headers=alice).status_code == 200
+    assert client.get(url).json()["score"]["vote_count"] == 1
+    assert client.post(f"{url}/comments/", json={"comment": "first"}, headers=alice).status_code == 201
+    assert [comment["comment"] for comment in client.get(url).json()["post_comments"]] == ["first"]
+    assert client.put(url, json={"title": "renamed"}, headers=alice).status_code == 200
+    assert client.get(url).json()["title"] == "renamed"
+    assert client.get("/api/v1/users/alice/posts/").json()["items"][0]["title"] == "renamed"
+    assert client.delete(url, headers=alice).status_code == 202
+    assert client.get(url).status_code == 404
+    assert client.get("/api/v1/users/alice/posts/").json()["items"] == []
+
+def test_writer_reads_past_a_cache_filled_from_a_replica(client, use_replicas):
+    # the replica lags behind: alice exists there without any post
+    router = use_replicas(replica_database("alice"))
+    alice = create_user(client, "alice")
+    router.recent_writers.clear()
+    create_post(client, alice, "alice")
+    # an anonymous read fills the new generation from the replica
+    assert client.get("/api/v1/users/alice/posts/").json()["items"] == []
+    assert len(client.get("/api/v1/users/alice/posts/", headers=alice).json()["items"]) == 1
+
+def test_recount_in_a_worker_process_reaches_the_web_cache(client, drain, monkeypatch):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    puid = create_post(client, alice, "alice")
+    url = f"/api/v1/users/alice/posts/{puid}"
+    assert client.put(f"{url}/votes/", json={"vote": 5}, headers=bob).status_code == 200
+    assert client.delete("/api/v1/users/bob", headers=bob).status_code == 202
+    assert client.get(url).json()["score"]["vote_count"] == 1
+    # python -m app.cli worker has a cache of its own
+    monkeypatch.setattr(tasks, "response_cache", ResponseCache(MemoryCache()))
+    drain()
+    assert client.get(url).json()["score"]["vote_count"] == 1
+    client.portal.call(response_cache.sync, AsyncSessionLocal)
+    assert client.get(url).json()["score"]["vote_count"] == 0
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app import schemas
+from app.main import app
+from app.responses import AppJSONResponse, ModelJSONRoute
+
+def is_wrapped(route):
+    return route.dependant.call is not route.endpoint
+
+def test_mounted_model_routes_serialize_with_pydantic_core():
+    routes = [route for route in app.routes if isinstance(route, ModelJSONRoute) and route.response_model is not None]
+    assert routes
+    assert all(is_wrapped(route) for route in routes), [route.path for route in routes if not is_wrapped(route)]
+
+def test_route_opts_out_with_its_own_response_class():
+    test_app = FastAPI(default_response_class=AppJSONResponse)
+    router = APIRouter(route_class=ModelJSONRoute)
+
+    @router.get("/default", response_model=schemas.GetScore)
+    async def default_route():
+        return {"vote_count": 2, "vote_sum": 7, "average": 3.5, "histogram": [0, 0, 1, 0, 0, 1]}
+
+    @router.get("/stock", response_model=schemas.GetScore, response_class=JSONResponse)
+    async def stock_route():
+        return {"vote_count": 2, "vote_sum": 7, "average": 3.5, "histogram": [0, 0, 1, 0, 0, 1]}
+
+    test_app.include_router(router)
+    routes = {route.path: route for route in test_app.routes}
+    assert is_wrapped(routes["/default"])
+    assert not is_wrapped(routes["/stock"])
+    with TestClient(test_app) as client:
+        default, stock = client.get("/default"), client.get("/stock")
+    assert default.json() == stock.json()
+    assert default.content == b'{"vote_count":2,"vote_sum":7,"average":3.5,"histogram":[0,0,1,0,0,1]}'
@@ -0,0 +1,46 @@
+from .conftest import create_post, create_user
+
+def search(client, q, **params):
+    response = client.get("/api/v1/search/", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def titles(page):
+    return [item["title"] for item in page["items"]]
+
+def test_title_matches_rank_above_description_and_comment_matches(client, drain):
+    alice = create_user(client, "alice")
+    in_comment = create_post(client, alice, "alice", title="third")
+    client.post("/api/v1/users/alice/posts/", json={"title": "second", "description": "about kayaks"}, headers=alice)
+    create_post(client, alice, "alice", title="kayak trip")
+    create_post(client, alice, "alice", title="unrelated")
+    client.post(f"/api/v1/users/alice/posts/{in_comment}/comments/", json={"comment": "kayaking is fun"}, headers=alice)
+    # comments are indexed by the refresh_posts job
+    assert titles(search(client, "kayak")) == ["kayak trip", "second"]
+    drain()
+    assert titles(search(client, "kayak")) == ["kayak trip", "second", "third"]
+    # the last word matches as a prefix
+    assert titles(search(client, "kaya")) == ["kayak trip", "second", "third"]
+    assert search(client, "!!")["items"] == []
+
+def test_results_page_through_the_cursor(client):
+    alice = create_user(client, "alice")
+    for index in range(5):
+        create_post(client, alice, "alice", title=f"kayak {index}")
+    seen, cursor = [], None
+    while True:
+        page = search(client, "kayak", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += titles(page)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == [f"kayak {index}" for index in range(5)]
+    assert len(seen) == 5
+
+def test_tombstoned_posts_are_hidden(client):
+    alice = create_user(client, "alice")
+    puid = create_post(client, alice, "alice", title="kayak gone")
+    create_post(client, alice, "alice", title="kayak kept")
+    assert client.delete(f"/api/v1/users/alice/posts/{puid}", headers=alice).status_code == 202
+    # before the purge removes it from the index
+    assert titles(search(client, "kayak")) == ["kayak kept"]
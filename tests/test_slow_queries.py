@@ -0,0 +1,54 @@
+import logging
+
+import pytest
+
+from app import slow_queries
+from app.config import settings
+from app.database import engine
+from app.slow_queries import SlowQueryLog, slow_query_log
+from .conftest import ADMIN, create_user
+
+STATEMENT = "SELECT users.id FROM users WHERE users.username = ?"
+
+@pytest.fixture
+def explains(monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_explain", True)
+    calls = []
+    explain = slow_queries.explain
+
+    def counted(conn, statement, parameters):
+        calls.append(statement)
+        return explain(conn, statement, parameters)
+
+    monkeypatch.setattr(slow_queries, "explain", counted)
+    return calls
+
+def test_plan_is_captured_once_per_statement(explains, caplog):
+    log = SlowQueryLog()
+    with engine.connect() as conn, caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        log.observe(conn, STATEMENT, ("alice",), False, 0.3, "GET /users")
+        log.observe(conn, STATEMENT, ("bob",), False, 0.5, "GET /users")
+    assert explains == [STATEMENT]
+    [entry] = log.worst()
+    assert (entry["count"], entry["max_seconds"], entry["route"], entry["parameters"]) == (2, 0.5, "GET /users", ["str"])
+    assert any("users" in line for line in entry["plan"])
+    # types only, the values stay out of the log
+    assert "slow query 500.0ms route=GET /users parameters=['str']" in caplog.text
+    assert "alice" not in caplog.text
+
+def test_only_the_top_n_slowest_statements_are_kept():
+    log = SlowQueryLog(top_n=2)
+    for statement, seconds in [("SELECT 1", 0.3), ("SELECT 2", 0.1), ("SELECT 3", 0.2)]:
+        log.observe(None, statement, (), True, seconds)
+    assert [entry["statement"] for entry in log.worst()] == ["SELECT 1", "SELECT 3"]
+
+def test_slow_requests_show_up_with_their_route(client, explains, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    slow_query_log.reset()
+    create_user(client, "alice")
+    assert client.get("/api/v1/users/alice").status_code == 200
+    statements = client.get("/status/slow-queries", headers=ADMIN).json()["statements"]
+    slow_query_log.reset()
+    routes = {entry["route"] for entry in statements}
+    assert "GET /api/v1/users/{username}" in routes
+    assert all(entry["plan"] for entry in statements if entry["statement"].startswith("SELECT"))
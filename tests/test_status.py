@@ -0,0 +1,18 @@
+import pytest
+
+from .conftest import ADMIN, create_user
+
+ENDPOINTS = ["/metrics", "/status/pool", "/status/caches", "/status/load", "/status/slow-queries"]
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_operational_endpoints_need_the_admin_token(client, url):
+    alice = create_user(client, "alice")
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers=alice).status_code == 403
+    assert client.get(url, headers=ADMIN).status_code == 200
+
+def test_metrics_count_requests_per_route(client):
+    client.get("/api/v1/users/")
+    metrics = client.get("/metrics", headers=ADMIN)
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/users/",status="200"}' in metrics.text
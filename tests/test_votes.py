@@ -0,0 +1,63 @@
+from sqlalchemy.dialects import postgresql
+
+from app import vote_stats
+from app.config import settings
+from app.queries import count_statements
+from .conftest import create_post, create_user
+
+def score(client, puid):
+    return client.get(f"/api/v1/users/alice/posts/{puid}").json()["score"]
+
+def vote(client, headers, puid, value):
+    response = client.put(f"/api/v1/users/alice/posts/{puid}/votes/", json={"vote": value}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_revote_and_vote_change(client):
+    alice, bob = create_user(client, "alice"), create_user(client, "bob")
+    puid = create_post(client, alice, "alice")
+    vote(client, alice, puid, 4)
+    vote(client, alice, puid, 4)
+    assert score(client, puid) == {"vote_count": 1, "vote_sum": 4, "average": 4.0, "histogram": [0, 0, 0, 0, 1, 0]}
+    vote(client, alice, puid, 2)
+    vote(client, bob, puid, 5)
+    assert score(client, puid) == {"vote_count": 2, "vote_sum": 7, "average": 3.5, "histogram": [0, 0, 1, 0, 0, 1]}
+    votes = client.get(f"/api/v1/users/alice/posts/{puid}/votes/").json()["items"]
+    assert sorted(item["vote"] for item in votes) == [2, 5]
+
+def test_batch_revote_and_vote_change(client):
+    alice = create_user(client, "alice")
+    first, second = create_post(client, alice, "alice"), create_post(client, alice, "alice")
+    vote(client, alice, first, 1)
+    batch = {"items": [
+        {"username": "alice", "puid": first, "vote": 3},
+        {"username": "alice", "puid": second, "vote": 5},
+        {"username": "alice", "puid": second, "vote": 5},
+    ]}
+    assert client.post("/api/v1/batch/votes", json=batch, headers=alice).status_code == 200
+    assert client.post("/api/v1/batch/votes", json=batch, headers=alice).status_code == 200
+    assert score(client, first)["histogram"] == [0, 0, 0, 1, 0, 0]
+    assert score(client, second) == {"vote_count": 1, "vote_sum": 5, "average": 5.0, "histogram": [0, 0, 0, 0, 0, 1]}
+
+def test_counters_are_locked_in_post_order():
+    statement = str(vote_stats.lock_stats([3, 1]).compile(dialect=postgresql.dialect()))
+    assert statement.endswith("ORDER BY post_vote_stats.post_id FOR UPDATE")
+
+def test_counter_update_reads_no_vote_rows(client):
+    alice = create_user(client, "alice")
+    puid = create_post(client, alice, "alice")
+    vote(client, alice, puid, 4)
+    with count_statements() as statements:
+        vote(client, alice, puid, 2)
+    update = next(statement for statement in statements if statement.startswith("UPDATE post_vote_stats"))
+    assert "post_votes" not in update
+    # the previous vote is read once, by previous_votes
+    assert len([statement for statement in statements if statement.startswith("SELECT post_votes")]) == 1
+    assert score(client, puid)["histogram"] == [0, 0, 1, 0, 0, 0]
+
+def test_oversized_batch_is_rejected_before_item_validation(client):
+    alice = create_user(client, "alice")
+    items = [{"username": "alice", "puid": "not a number", "vote": 9}] * (settings.batch_max_items + 1)
+    response = client.post("/api/v1/batch/votes", json={"items": items}, headers=alice)
+    assert response.status_code == 422
+    assert [error["type"] for error in response.json()["detail"]] == ["too_long"]